@@ -68,18 +68,18 @@ def main():
 	for p in paths:
 		try:
 			name = p['name']
-			for e in p.edges:
-				if e not in G.edges():
-					raise RuntimeError('Arc %s in path %s not found in network arcs. ' % (str(e),str(name)))
-		except:
+		except KeyError:
 			raise RuntimeError('Path %s is not named.' % str(p))
+		for e in p.edges:
+			if not G.has_edge(e[0],e[1]):
+				raise RuntimeError('Arc %s in path %s not found in network arcs. ' % (str(e),str(name)))
 	
 	# Check that commodity (o,d) are each nodes in the network, and
 	# that each has at least one path
 	for k in commods:
 		dummycost = 0
 		try:
-			if (k[0] not in G.nodes()) or (k[1] not in G.nodes()):
+			if (not G.has_node(k[0])) or (not G.has_node(k[1])):
 				raise RuntimeError('Commodity %s connects nodes not both in network.' % str(k))
 				
 			dummycost += commods[k]['q']
@@ -184,13 +184,17 @@ def main():
 		prob += pulp.lpSum(p['dvPathSelect'] for p in commods[k]['paths']) == 1, "Commodity %s Path Selection" % str(k)
 		
 	# Trailer counts
+	# Index the paths that contain each arc, in one pass over the paths
+	arc_paths = {}
+	for p in paths:
+		for e in p.edge_set:
+			arc_paths.setdefault(e, []).append(p)
 	for i,j in G.edges():
 		pathFracTrailers = []
-		# Look for paths that contain arc (i,j)
-		for p in paths:
-			if (i,j) in p:
-				q = commods[(p.origin,p.dest)]['q']
-				pathFracTrailers.append( q*p['dvPathSelect'] )
+		# Look up the paths that contain arc (i,j)
+		for p in arc_paths.get((i,j), []):
+			q = commods[(p.origin,p.dest)]['q']
+			pathFracTrailers.append( q*p['dvPathSelect'] )
 		# If any paths contain the arc (i,j), build a trailer round up constraint
 		if pathFracTrailers:
 			prob += pulp.lpSum(pathFracTrailers) <= G[i][j]['dvTrailerFlow'], "Arc (%s,%s) Trailer Roundup" % (str(i),str(j))
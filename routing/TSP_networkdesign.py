@@ -11,20 +11,42 @@
 #  use the selected arcs to send flow from an arbitrary first node to all
 #  other nodes
 #
+#  TSP_subtour
+#
+#  a function which, given a graph (directed or undirected) in the networkx
+#  format, returns an optimal TSP cycle using a cutting plane method: the
+#  model starts with the degree constraints only, and subtour elimination
+#  constraints are added as they are found violated.  The LP relaxation is
+#  solved first, with cuts from the connected components of the support
+#  graph and, once it is connected, from its Stoer-Wagner minimum cut.
+#  Then the variables are made binary, and integer solutions are cut by
+#  their components until one is a single cycle.  Each iteration is timed
+#
 #  cycles will be in node list format: [first, ..., last, first]
 #
 #  Inputs:
 #
 #   G           - network in networkx format
+#   init_cycle  - optional known cycle (TSP_networkdesign), set as the MIP
+#                 start; solutions costing more than it are cut off
+#   k           - optional neighbor count (TSP_networkdesign): build the
+#                 model only on the arcs to each node's k nearest neighbors,
+#                 the arcs of init_cycle (a nearest neighbor cycle if none
+#                 is given), and the arcs which LP reduced costs show could
+#                 beat that cycle, so the result is still optimal
+#   max_iter    - optional limit on solve/separate iterations (TSP_subtour)
 #
 
 # Module imports
 import networkx as nx
+import nearest_neighbor_simple as nns
 # Import PuLP modeler functions
 from pulp import *
+# Imported after PuLP, whose names would otherwise replace it
+import time
 
 
-def TSP_networkdesign(G):
+def TSP_networkdesign(G, init_cycle=None, k=None):
     
     # Let n be the number of nodes
     n = len(G)
@@ -49,56 +71,33 @@ def TSP_networkdesign(G):
                 GD[i][j]['cost'] = G[i][j]['cost']
                 GD.add_edge(j,i,{'cost':G[i][j]['cost']})
                 
-    # Create the math programming problem 'prob'
-    prob = LpProblem("TSP By Network Design", LpMinimize)
-    
-    # Create TSP arc selection variables and flow variables for each directed arc
-    # networkx format already stores arcs arranged by their "from" or "tail" nodes
-    for i in GD:
-        for j in GD[i]:          
-            # Arc name
-            a = str((i,j))
-        
-            # Variable generation for the "assignment" or "selection" variables
-            var = LpVariable("ArcSelect_%s" % a, cat=LpBinary)
-            # Add arc selection variable to the data dictionary for the arc
-            GD[i][j]['vSelect'] = var
-        
-            # Variable generation for the "flow" variables
-            var = LpVariable("ArcFlow_%s" % a, lowBound=0)
-            GD[i][j]['vFlow'] = var
-            
-    # The objective function is added to 'prob' first
-    prob += lpSum([GD[i][j]['cost']*GD[i][j]['vSelect'] for (i,j) in GD.edges()]), "Total Cost"
-    
-    # Assignment constraints
-    # Generate successor selection constraint for each node
-    for i in GD:
-        prob += lpSum([GD[i][j]['vSelect'] for j in GD.successors(i)]) == 1, "Node %s Successor Selection" % str(i)
-    # Generate predecessor selection constraint for each node    
-    for j in GD:
-        prob += lpSum([GD[i][j]['vSelect'] for i in GD.predecessors(j)]) == 1, "Node %s Predecessor Selection" % str(j)
-
-    # Flow constraints
-    # Generate flow upper bound constraints for each arc
-    for (i,j) in GD.edges():
-        prob += GD[i][j]['vFlow'] <= (n-1)*GD[i][j]['vSelect'], "Arc %s Flow Upper Bound" % str((i,j))
-
-    # Generate flow balance constraint for first node
     # In case it is not named node "1", we must use this strange form to get the first node
     first = GD.nodes()[0]
-    prob += lpSum([GD[first][j]['vFlow'] for j in GD.successors(first)]) - lpSum([GD[j][first]['vFlow'] for j in GD.predecessors(first)]) == n - 1, "Node %s Flow Balance" % str(first)
-    
-    # Generate flow balance constraints for all but first node
-    for i in GD:
-        if i != first:
-            prob += lpSum([GD[i][j]['vFlow'] for j in GD.successors(i)]) - lpSum([GD[j][i]['vFlow'] for j in GD.predecessors(i)]) == - 1, "Node %s Flow Balance" % str(i)
-    
+
+    # Build the model on every arc, or on sparse candidate arcs that
+    # provably contain an optimal cycle
+    if k == None:
+        arcs = GD.edges()
+    else:
+        if init_cycle == None:
+            init_cycle = nns.NearNeighCycle(G, first)
+        cycle_arcs = list(zip(init_cycle[:-1], init_cycle[1:]))
+        arcs = NearestArcs(GD, k) | set(cycle_arcs)
+        cycle_cost = sum(GD[i][j]['cost'] for (i,j) in cycle_arcs)
+        arcs = SparseCandidateArcs(GD, arcs, cycle_cost, lambda arcs: TSPModel(GD, arcs, first, relax=True), n - 1)
+    (prob, rows) = TSPModel(GD, arcs, first)
+
+    # Start from the initial cycle, and cut off any solution costing more
+    if init_cycle != None:
+        cycle_cost = SetInitialCycle(GD, init_cycle, first)
+        prob += prob.objective <= cycle_cost + 0.000001, "Incumbent Cutoff"
+        print('MIP start from initial cycle, with cost:%s' % str(cycle_cost))
+
     # Write out as a .LP file
     prob.writeLP("TSPNetworkDesignIP.lp")
 
     # The problem is solved using PuLP's choice of Solver
-    prob.solve(GUROBI())
+    prob.solve(GUROBI(warmStart=(init_cycle != None)))
 
     # The status of the solution is printed to the screen
     print "Status:", LpStatus[prob.status]
@@ -112,7 +111,6 @@ def TSP_networkdesign(G):
     
     # Create the optimal cycle from the optimal variable values in the solution, and return it
     # Start at the arbitrary first node, and find its successor, then the next successor, etc.
-    first = GD.nodes()[0]
     current = first
     cycle = [current]
     next = []
@@ -121,7 +119,8 @@ def TSP_networkdesign(G):
     while next != first:
         # Find the successor of current
         for j in GD[current]:
-            if GD[current][j]['vSelect'].varValue == 1:
+            # Arcs left out of a sparse model have no selection variable
+            if GD[current][j].get('vSelect') is not None and GD[current][j]['vSelect'].varValue > 0.5:
                 # Next is the optimal successor
                 next = j
                 cycle = cycle + [next]
@@ -134,3 +133,277 @@ def TSP_networkdesign(G):
     print('Cycle: %s, with cost:%s' % (str(cycle),str(cycle_cost)))
     
     return(cycle)
+
+
+# Build the network design model of directed network GD on the given arcs,
+# with LP relaxed selection variables if relax is True.  Returns the model,
+# and its successor, predecessor and flow balance constraints by node
+def TSPModel(GD, arcs, first, relax=False):
+
+    n = len(GD)
+    if relax:
+        select_cat = LpContinuous
+    else:
+        select_cat = LpBinary
+
+    # Create the math programming problem 'prob'
+    prob = LpProblem("TSP By Network Design", LpMinimize)
+
+    # Clear the variables of any earlier model
+    for (i,j) in GD.edges():
+        GD[i][j]['vSelect'] = None
+        GD[i][j]['vFlow'] = None
+
+    # Create TSP arc selection variables and flow variables for each model arc
+    out_arcs = dict((i, []) for i in GD)
+    in_arcs = dict((i, []) for i in GD)
+    for (i,j) in arcs:
+        # Arc name
+        a = str((i,j))
+
+        # Variable generation for the "assignment" or "selection" variables
+        var = LpVariable("ArcSelect_%s" % a, lowBound=0, upBound=1, cat=select_cat)
+        # Add arc selection variable to the data dictionary for the arc
+        GD[i][j]['vSelect'] = var
+
+        # Variable generation for the "flow" variables
+        var = LpVariable("ArcFlow_%s" % a, lowBound=0)
+        GD[i][j]['vFlow'] = var
+        out_arcs[i].append(j)
+        in_arcs[j].append(i)
+
+    # The objective function is added to 'prob' first
+    prob += lpSum([GD[i][j]['cost']*GD[i][j]['vSelect'] for (i,j) in arcs]), "Total Cost"
+
+    # Assignment constraints, kept by node for their dual values
+    rows = {'succ':{}, 'pred':{}, 'flow':{}}
+    # Generate successor selection constraint for each node
+    for i in GD:
+        rows['succ'][i] = lpSum([GD[i][j]['vSelect'] for j in out_arcs[i]]) == 1
+        prob += rows['succ'][i], "Node %s Successor Selection" % str(i)
+    # Generate predecessor selection constraint for each node
+    for j in GD:
+        rows['pred'][j] = lpSum([GD[i][j]['vSelect'] for i in in_arcs[j]]) == 1
+        prob += rows['pred'][j], "Node %s Predecessor Selection" % str(j)
+
+    # Flow constraints
+    # Generate flow upper bound constraints for each arc
+    for (i,j) in arcs:
+        prob += GD[i][j]['vFlow'] <= (n-1)*GD[i][j]['vSelect'], "Arc %s Flow Upper Bound" % str((i,j))
+
+    # Generate flow balance constraints: n-1 units leave the first node,
+    # and every other node keeps one
+    for i in GD:
+        if i == first:
+            rhs = n - 1
+        else:
+            rhs = -1
+        rows['flow'][i] = lpSum([GD[i][j]['vFlow'] for j in out_arcs[i]]) - lpSum([GD[j][i]['vFlow'] for j in in_arcs[i]]) == rhs
+        prob += rows['flow'][i], "Node %s Flow Balance" % str(i)
+
+    return(prob, rows)
+
+# The arcs of directed network GD from each node to its k cheapest
+# neighbors, and their reverse arcs
+def NearestArcs(GD, k):
+    arcs = set()
+    for i in GD:
+        near = sorted(GD[i], key=lambda j: GD[i][j]['cost'])[:k]
+        for j in near:
+            arcs.add((i,j))
+            if GD.has_edge(j,i):
+                arcs.add((j,i))
+    return(arcs)
+
+# Grow a set of candidate arcs of directed network GD, which must hold a
+# solution costing upper_bound, until it provably holds an optimal one.
+# relaxed_model(arcs) builds the LP relaxation on the arcs, returning the
+# model and its rows as TSPModel does, and cap is the flow capacity of a
+# selected arc.  Arcs with negative reduced cost are priced in until none
+# remain; then, with LP bound L, every arc with reduced cost at most
+# upper_bound - L is added too, since any solution using a left out arc
+# costs more than upper_bound
+def SparseCandidateArcs(GD, arcs, upper_bound, relaxed_model, cap):
+
+    arcs = set(arcs)
+
+    # Price arcs into the LP relaxation until its bound holds for all arcs
+    while True:
+        (prob, rows) = relaxed_model(sorted(arcs, key=str))
+        prob.solve()
+        if LpStatus[prob.status] != 'Optimal':
+            raise RuntimeError('Sparse relaxation status: %s' % LpStatus[prob.status])
+        bound = value(prob.objective)
+        reduced = ReducedCosts(GD, arcs, rows, cap)
+        priced = [a for a in reduced if reduced[a] < -0.000001]
+        print('Candidate arcs: %d, LP bound: %s, priced in: %d' % (len(arcs),str(bound),len(priced)))
+        if not priced:
+            break
+        arcs.update(priced)
+
+    # Reduced cost fixing against the known solution
+    fixed = [a for a in reduced if bound + reduced[a] <= upper_bound + 0.000001]
+    arcs.update(fixed)
+    print('Candidate arcs: %d of %d, after adding %d that may beat cost %s' % (len(arcs),GD.number_of_edges(),len(fixed),str(upper_bound)))
+
+    return(sorted(arcs, key=str))
+
+# Reduced cost of each arc of directed network GD not in arcs, from the
+# dual values of the rows of an LP relaxation with flow capacity cap.  The
+# dual of an arc's missing flow upper bound constraint is chosen to keep
+# its flow variable's reduced cost at zero or above
+def ReducedCosts(GD, arcs, rows, cap):
+    reduced = {}
+    for (i,j) in GD.edges():
+        if (i,j) in arcs:
+            continue
+        rc = GD[i][j]['cost']
+        if i in rows['succ']:
+            rc = rc - rows['succ'][i].pi
+        if j in rows['pred']:
+            rc = rc - rows['pred'][j].pi
+        rc = rc - cap*max(0, rows['flow'][i].pi - rows['flow'][j].pi)
+        reduced[(i,j)] = rc
+    return(reduced)
+
+# Set the initial values of the selection and flow variables of directed
+# network GD to the cycle init_cycle, with n-1 units of flow leaving node
+# first and one unit dropped at each later node.  Returns the cycle cost
+def SetInitialCycle(GD, init_cycle, first):
+    n = len(GD)
+    if len(init_cycle) != n + 1 or set(init_cycle) != set(GD.nodes()):
+        raise RuntimeError('Initial cycle must visit every node once: %s' % str(init_cycle))
+    for (i,j) in GD.edges():
+        if GD[i][j]['vSelect'] is not None:
+            GD[i][j]['vSelect'].setInitialValue(0)
+            GD[i][j]['vFlow'].setInitialValue(0)
+    # Walk the cycle from node first
+    s = init_cycle.index(first)
+    tour = init_cycle[s:-1] + init_cycle[:s] + [first]
+    cycle_cost = 0
+    for k in range(n):
+        (i, j) = (tour[k], tour[k+1])
+        if not GD.has_edge(i,j) or GD[i][j]['vSelect'] is None:
+            raise RuntimeError('Initial cycle arc (%s,%s) not in network.' % (str(i),str(j)))
+        GD[i][j]['vSelect'].setInitialValue(1)
+        GD[i][j]['vFlow'].setInitialValue(n - 1 - k)
+        cycle_cost = cycle_cost + GD[i][j]['cost']
+    return(cycle_cost)
+
+
+def TSP_subtour(G, max_iter=1000):
+
+    # Start the clock
+    start_time = time.time()
+    directed = G.is_directed()
+    nodes = list(G.nodes())
+    if len(nodes) < 3:
+        raise RuntimeError('TSP_subtour needs at least 3 nodes.')
+
+    # Create the math programming problem 'prob'
+    prob = LpProblem("TSP By Subtour Elimination", LpMinimize)
+
+    # Create an arc (directed) or edge (undirected) selection variable for
+    # each arc, continuous until the LP relaxation has no violated cuts
+    x = {}
+    for (i,j,attr) in G.edges(data=True):
+        if i == j:
+            continue
+        try:
+            cost = attr['cost']
+        except KeyError:
+            raise RuntimeError('Each arc must have a cost attribute. Check (%s, %s)' % (str(i),str(j)) )
+        x[(i,j)] = (LpVariable("ArcSelect_%s" % str((i,j)), lowBound=0, upBound=1), cost)
+
+    # The objective function is added to 'prob' first
+    prob += lpSum([cost*var for (var, cost) in x.values()]), "Total Cost"
+
+    # Degree constraints: one successor and one predecessor for each node
+    # in a directed graph, two selected edges otherwise
+    incident = dict((i, []) for i in nodes)
+    for (i,j) in x:
+        incident[i].append(x[(i,j)][0])
+        incident[j].append(x[(i,j)][0])
+    for i in nodes:
+        if directed:
+            prob += lpSum([x[(i,j)][0] for j in G.successors(i) if (i,j) in x]) == 1, "Node %s Successor Selection" % str(i)
+            prob += lpSum([x[(j,i)][0] for j in G.predecessors(i) if (j,i) in x]) == 1, "Node %s Predecessor Selection" % str(i)
+        else:
+            prob += lpSum(incident[i]) == 2, "Node %s Degree" % str(i)
+
+    cuts = 0
+    integer = False
+    for iteration in range(1, max_iter+1):
+        iteration_start = time.time()
+
+        # Solve with PuLP's default (locally available) solver
+        prob.solve()
+        if LpStatus[prob.status] != 'Optimal':
+            raise RuntimeError('TSP_subtour model status: %s' % LpStatus[prob.status])
+
+        # Support graph of the solution; an arc and its reverse add up
+        H = nx.Graph()
+        H.add_nodes_from(nodes)
+        for ((i,j), (var, cost)) in x.items():
+            x_value = var.varValue
+            if x_value > 0.000001:
+                if H.has_edge(i,j):
+                    H[i][j]['weight'] += x_value
+                else:
+                    H.add_edge(i,j,weight=x_value)
+
+        # Separation: each component of a disconnected support graph is a
+        # violated subtour; a connected one may still have a cut below 2
+        subtours = [set(S) for S in nx.connected_components(H)]
+        if len(subtours) == 1:
+            subtours = []
+            if not integer:
+                (cut_value, (S, T)) = nx.stoer_wagner(H)
+                if cut_value < 2 - 0.000001:
+                    subtours = [set(S)]
+        for S in subtours:
+            cuts += 1
+            if directed:
+                prob += lpSum([var for ((i,j), (var, cost)) in x.items() if i in S and j not in S]) >= 1, "Subtour %d" % cuts
+            else:
+                prob += lpSum([var for ((i,j), (var, cost)) in x.items() if (i in S) != (j in S)]) >= 2, "Subtour %d" % cuts
+
+        print('Iteration %d (%s): bound %s, %d new cuts, %.2f seconds' % (iteration, 'integer' if integer else 'LP', str(value(prob.objective)), len(subtours), time.time() - iteration_start))
+
+        if not subtours:
+            if integer:
+                break
+            # The LP relaxation satisfies every subtour constraint; now
+            # require binary selections
+            integer = True
+            for (var, cost) in x.values():
+                var.cat = LpInteger
+    else:
+        raise RuntimeError('TSP_subtour found no cycle in %d iterations.' % max_iter)
+
+    # The optimised objective function value is printed to the screen
+    print('Total Cost = %s, after %d cuts in %.2f seconds' % (str(value(prob.objective)), cuts, time.time() - start_time))
+
+    # Walk the selected arcs from the first node to create the cycle
+    succ = {}
+    for ((i,j), (var, cost)) in x.items():
+        if var.varValue > 0.5:
+            succ.setdefault(i, []).append((j, cost))
+            if not directed:
+                succ.setdefault(j, []).append((i, cost))
+    first = nodes[0]
+    cycle = [first]
+    cycle_cost = 0
+    prev = None
+    current = first
+    while len(cycle) == 1 or current != first:
+        for (j, cost) in succ[current]:
+            if j != prev:
+                break
+        cycle.append(j)
+        cycle_cost = cycle_cost + cost
+        (prev, current) = (current, j)
+
+    print('Cycle: %s, with cost:%s' % (str(cycle),str(cycle_cost)))
+
+    return(cycle)
@@ -21,13 +21,23 @@
 #
 #   m           - optional number of vehicle routes
 #
+#   init_routes - optional known routes, each [depot, ..., depot], set as
+#                 the MIP start; solutions costing more are cut off
+#
+#   k           - optional neighbor count: build the model only on the arcs
+#                 to each node's k nearest neighbors, the depot arcs, the
+#                 arcs of init_routes (out-and-back routes if none are
+#                 given), and the arcs which LP reduced costs show could
+#                 beat those routes, so the result is still optimal
+#
 
 # Module imports
 import networkx as nx
+import TSP_networkdesign as tspnd
 # Import PuLP modeler functions
 from pulp import *
 
-def VRP_networkdesign(G, Q, m=False):
+def VRP_networkdesign(G, Q, m=False, init_routes=None, k=None):
     
     # Total Customer Demand
     TotalDemand = 0
@@ -59,53 +69,125 @@ def VRP_networkdesign(G, Q, m=False):
                 GD[i][j]['cost'] = G[i][j]['cost']
                 GD.add_edge(j,i,{'cost':G[i][j]['cost']})
                 
+    # Build the model on every arc, or on sparse candidate arcs that
+    # provably contain an optimal solution
+    if k == None:
+        arcs = GD.edges()
+    else:
+        # The depot is the node with no demand
+        depot = [i for i in GD if GD.node[i]['demand'] == 0][0]
+        if init_routes == None:
+            if m != False:
+                raise RuntimeError('Sparse VRP model with m routes needs init_routes.')
+            # One out-and-back route per customer
+            init_routes = [[depot, i, depot] for i in GD if GD.node[i]['demand'] > 0]
+        route_arcs = [(i,j) for route in init_routes for (i,j) in zip(route[:-1], route[1:])]
+        depot_arcs = [(i,j) for (i,j) in GD.edges() if i == depot or j == depot]
+        arcs = tspnd.NearestArcs(GD, k) | set(route_arcs) | set(depot_arcs)
+        routes_cost = sum(GD[i][j]['cost'] for (i,j) in route_arcs)
+        arcs = tspnd.SparseCandidateArcs(GD, arcs, routes_cost, lambda arcs: VRPModel(GD, arcs, Q, m, relax=True), Q)
+    (prob, rows) = VRPModel(GD, arcs, Q, m)
+
+    # Start from the initial routes, and cut off any solution costing more
+    if init_routes != None:
+        if m != False and len(init_routes) != m:
+            raise RuntimeError('Initial routes must number m = %s, not %d' % (str(m),len(init_routes)))
+        routes_cost = SetInitialRoutes(GD, init_routes, Q)
+        prob += prob.objective <= routes_cost + 0.000001, "Incumbent Cutoff"
+        print('MIP start from initial routes, with cost:%s' % str(routes_cost))
+
+    # Write out as a .LP file
+    prob.writeLP("VRPNetworkDesignIP.lp")
+
+    # The problem is solved using PuLP's choice of Solver
+    prob.solve(GUROBI(warmStart=(init_routes != None)))
+
+    # The status of the solution is printed to the screen
+    print "Status:", LpStatus[prob.status]
+
+    # Each of the variables is printed with it's resolved optimum value
+    #for v in prob.variables():
+    #    print v.name, "=", v.varValue
+
+    # The optimised objective function value is printed to the screen    
+    print "Total Cost = ", value(prob.objective)
+        
+    return(1)
+
+# Build the network design model of directed network GD on the given arcs,
+# with LP relaxed selection variables if relax is True.  Returns the model,
+# and its successor, predecessor and flow balance constraints by node
+def VRPModel(GD, arcs, Q, m=False, relax=False):
+
+    n = len(GD)
+    if relax:
+        select_cat = LpContinuous
+    else:
+        select_cat = LpBinary
+
+    # Total Customer Demand
+    TotalDemand = sum(GD.node[i]['demand'] for i in GD)
+
     # Create the math programming problem 'prob'
     prob = LpProblem("VRP By Network Design", LpMinimize)
-    
-    # Create VRP arc selection variables and flow variables for each directed arc
-    # networkx format already stores arcs arranged by their "from" or "tail" nodes
-    for i in GD:
-        for j in GD[i]:          
-            # Arc name
-            a = str((i,j))
-        
-            # Variable generation for the "assignment" or "selection" variables
-            var = LpVariable("ArcSelect_%s" % a, cat=LpBinary)
-            # Add arc selection variable to the data dictionary for the arc
-            GD[i][j]['vSelect'] = var
-        
-            # Variable generation for the "flow" variables
-            var = LpVariable("ArcFlow_%s" % a, lowBound=0)
-            GD[i][j]['vFlow'] = var
-            
+
+    # Clear the variables of any earlier model
+    for (i,j) in GD.edges():
+        GD[i][j]['vSelect'] = None
+        GD[i][j]['vFlow'] = None
+
+    # Create VRP arc selection variables and flow variables for each model arc
+    out_arcs = dict((i, []) for i in GD)
+    in_arcs = dict((i, []) for i in GD)
+    for (i,j) in arcs:
+        # Arc name
+        a = str((i,j))
+
+        # Variable generation for the "assignment" or "selection" variables
+        var = LpVariable("ArcSelect_%s" % a, lowBound=0, upBound=1, cat=select_cat)
+        # Add arc selection variable to the data dictionary for the arc
+        GD[i][j]['vSelect'] = var
+
+        # Variable generation for the "flow" variables
+        var = LpVariable("ArcFlow_%s" % a, lowBound=0)
+        GD[i][j]['vFlow'] = var
+        out_arcs[i].append(j)
+        in_arcs[j].append(i)
+
     # The objective function is added to 'prob' first
-    prob += lpSum([GD[i][j]['cost']*GD[i][j]['vSelect'] for (i,j) in GD.edges()]), "Total Cost"
-        
-    # Assignment constraints
+    prob += lpSum([GD[i][j]['cost']*GD[i][j]['vSelect'] for (i,j) in arcs]), "Total Cost"
+
+    # Assignment constraints, kept by node for their dual values
+    rows = {'succ':{}, 'pred':{}, 'flow':{}}
     # Generate successor selection constraint (non-splittable) for each node, except the one with
     # no demand which is assumed to be the depot
     for i in GD:
+        select = lpSum([GD[i][j]['vSelect'] for j in out_arcs[i]])
         # Successors for customers
         if GD.node[i]['demand'] > 0:
-            prob += lpSum([GD[i][j]['vSelect'] for j in GD.successors(i)]) == 1, "Customer %s Successor Selection" % str(i)
+            rows['succ'][i] = select == 1
+            prob += rows['succ'][i], "Customer %s Successor Selection" % str(i)
         # For the depot node, if m is False then allow up to n successors.  If m is specified, then
         # choose exactly m successors
         elif m == False:
-            prob += lpSum([GD[i][j]['vSelect'] for j in GD.successors(i)]) <= n, "Depot %s Number of Routes Bound" % str(i)
+            rows['succ'][i] = select <= n
+            prob += rows['succ'][i], "Depot %s Number of Routes Bound" % str(i)
         else:
-            prob += lpSum([GD[i][j]['vSelect'] for j in GD.successors(i)]) == m, "Depot %s Number of Routes Selection" % str(i)     
-    
-    # Generate predecessor selection constraint for each customer node only    
+            rows['succ'][i] = select == m
+            prob += rows['succ'][i], "Depot %s Number of Routes Selection" % str(i)
+
+    # Generate predecessor selection constraint for each customer node only
     for j in GD:
         if GD.node[j]['demand'] > 0:
-            prob += lpSum([GD[i][j]['vSelect'] for i in GD.predecessors(j)]) == 1, "Node %s Predecessor Selection" % str(j)
+            rows['pred'][j] = lpSum([GD[i][j]['vSelect'] for i in in_arcs[j]]) == 1
+            prob += rows['pred'][j], "Node %s Predecessor Selection" % str(j)
 
     # Flow constraints
     # Generate flow upper bound constraints for each arc, which serve the role of
     # only allowing flow on design arcs chosen and limiting vehicle capacity
-    for (i,j) in GD.edges():
+    for (i,j) in arcs:
         prob += GD[i][j]['vFlow'] <= Q*GD[i][j]['vSelect'], "Arc %s Flow Upper Bound" % str((i,j))
-   
+
     # Generate flow balance constraints for all nodes
     for i in GD:
         # Flow consumed at node i is the demand...
@@ -113,22 +195,34 @@ def VRP_networkdesign(G, Q, m=False):
         # But if the demand is 0, this is the depot node which produces TotalDemand
         if rhs == 0:
             rhs = TotalDemand
-        prob += lpSum([GD[i][j]['vFlow'] for j in GD.successors(i)]) - lpSum([GD[j][i]['vFlow'] for j in GD.predecessors(i)]) == rhs, "Node %s Flow Balance" % str(i)
-    
-    # Write out as a .LP file
-    prob.writeLP("VRPNetworkDesignIP.lp")
-
-    # The problem is solved using PuLP's choice of Solver
-    prob.solve(GUROBI())
+        rows['flow'][i] = lpSum([GD[i][j]['vFlow'] for j in out_arcs[i]]) - lpSum([GD[j][i]['vFlow'] for j in in_arcs[i]]) == rhs
+        prob += rows['flow'][i], "Node %s Flow Balance" % str(i)
 
-    # The status of the solution is printed to the screen
-    print "Status:", LpStatus[prob.status]
-
-    # Each of the variables is printed with it's resolved optimum value
-    #for v in prob.variables():
-    #    print v.name, "=", v.varValue
+    return(prob, rows)
 
-    # The optimised objective function value is printed to the screen    
-    print "Total Cost = ", value(prob.objective)
-        
-    return(1)
+# Set the initial values of the selection and flow variables of directed
+# network GD to the routes init_routes, where each arc carries the demand
+# still to be delivered on its route.  Returns the total routes cost
+def SetInitialRoutes(GD, init_routes, Q):
+    for (i,j) in GD.edges():
+        if GD[i][j]['vSelect'] is not None:
+            GD[i][j]['vSelect'].setInitialValue(0)
+            GD[i][j]['vFlow'].setInitialValue(0)
+    visited = []
+    routes_cost = 0
+    for route in init_routes:
+        load = sum(GD.node[i]['demand'] for i in route[1:-1])
+        if load > Q:
+            raise RuntimeError('Initial route %s carries %s, over capacity %s' % (str(route),str(load),str(Q)))
+        for (i,j) in zip(route[:-1], route[1:]):
+            if not GD.has_edge(i,j) or GD[i][j]['vSelect'] is None:
+                raise RuntimeError('Initial route arc (%s,%s) not in network.' % (str(i),str(j)))
+            GD[i][j]['vSelect'].setInitialValue(1)
+            GD[i][j]['vFlow'].setInitialValue(load)
+            routes_cost = routes_cost + GD[i][j]['cost']
+            load = load - GD.node[j]['demand']
+        visited.extend(route[1:-1])
+    customers = set(i for i in GD if GD.node[i]['demand'] > 0)
+    if len(visited) != len(customers) or set(visited) != customers:
+        raise RuntimeError('Initial routes must visit every customer once.')
+    return(routes_cost)
@@ -6,81 +6,155 @@
 #  a function which, given a complete graph (directed or undirected) in the
 #  networkx format, returns a cycle using the cheap insertion heuristic
 #
+#  The cheapest insertion of each uninserted node is kept in a heap whose
+#  entries are invalidated lazily, and the cycle is kept as a linked list,
+#  so that each insertion only evaluates the two new arcs for every node,
+#  and re-evaluates only the nodes whose best arc it split.  Ties break as
+#  before: the first node in graph order, at the last arc in cycle order
+#  for a node re-evaluated over the whole cycle (as in
+#  FindInsertionLocation), and otherwise at the arc found first
+#
 #  cycles will be in node list format: [first, ..., last, first]
 #
+#  G may also be a CostMatrix (see cost_matrix.py); a networkx graph is
+#  converted to one once up front
+#
 
 # Module imports
+import heapq
 import networkx as nx
-import find_insertion as fi
+import numpy as np
+import cost_matrix as cm
+
+# Spacing of the cycle order labels, leaving room for many insertions
+# between two cycle nodes before the labels are spread out again
+label_gap = 2**32
 
 def CheapInsertionCycle(G, init_cycle=None):
     
+    # Convert the graph to a cost matrix once, and work with node indices
+    C = cm.AsCostMatrix(G)
+    n = len(C)
+    
     # If initial cycle is empty, find mincost edge
     if init_cycle == None:
-        # Grab all of the edge costs into dictionary d
-        d = nx.get_edge_attributes(G, 'cost')
-        # A python trick to find the key with minimum value in a dictionary
-        # min function returns an element (key) from d, but the one with minimum value (d.get)
-        mincost_edge = min(d, key=d.get)
-        cycle = [mincost_edge[0], mincost_edge[1], mincost_edge[0]]
+        (i, j) = C.extreme_arc()
+        cycle = [i, j, i]
     else:
-        cycle = init_cycle[:]
+        cycle = C.to_indices(init_cycle)
         
     # Initial cost
-    cycle_cost = 0
-    i = cycle[0]
-    for j in cycle[1:]:
-        cycle_cost += G[i][j]['cost']     
-        i = j
+    cycle_cost = C.cycle_cost(cycle)
+    
+    # Create an array of uninserted nodes
+    uninserted = np.ones(n, dtype=bool)
+    uninserted[cycle] = False
+    if not uninserted.any():
+        return(C.to_nodes(cycle))
     
-    # Create a list of uninserted nodes
-    uninserted_nodes = [node for node in G.nodes() if node not in cycle]
-    if not uninserted_nodes:
-        return(cycle)
+    # Store the cycle as a linked list: succ[i] follows i, and the first
+    # m entries of cycle_nodes are the nodes in the cycle, in any order.
+    # Labels increase along the cycle from the first node, to find the last
+    # of several tied arcs in cycle order
+    succ = np.full(n, -1, dtype=np.int64)
+    succ[cycle[:-1]] = cycle[1:]
+    cycle_nodes = np.empty(n, dtype=np.int64)
+    m = len(cycle) - 1
+    cycle_nodes[:m] = cycle[:-1]
+    label = np.zeros(n, dtype=np.int64)
+    label[cycle[:-1]] = np.arange(m)*label_gap
+    
+    # Maintain the cheapest insertion (cost, pred, succ) of each uninserted
+    # node in arrays, and a heap of (insertion cost, node, pred, succ)
+    # entries.  An entry is stale once it no longer matches the arrays; stale
+    # entries are only dropped when they reach the top.  The first entries
+    # come from one batched search over all nodes, whose ties go to the last
+    # arc in cycle order
+    nodes = np.flatnonzero(uninserted)
+    (best, cost) = C.insertion_locations(cycle[:-1], cycle[1:], nodes)
+    best_cost = np.full(n, np.inf)
+    best_pred = np.full(n, -1, dtype=np.int64)
+    best_succ = np.full(n, -1, dtype=np.int64)
+    best_cost[nodes] = cost
+    best_pred[nodes] = np.asarray(cycle)[best]
+    best_succ[nodes] = np.asarray(cycle)[best+1]
+    heap = list(zip(cost.tolist(), nodes.tolist(), best_pred[nodes].tolist(), best_succ[nodes].tolist()))
+    heapq.heapify(heap)
     
-    # Maintain two dictionaries: cheapest_insertion contains a node,
-    # insertion postion, and insertion cost for the cheapest current insertion
-    # to the cycle, and node_insertion_costs contains the cheapest insertion
-    # costs for the uninserted nodes
-    cheapest_insertion = {}
-    node_insertions = {}
-    for i in uninserted_nodes:
-        best_i_insertion = fi.FindInsertionLocation(G, cycle, i)
-        node_insertions[i] = best_i_insertion
-        if not cheapest_insertion or best_i_insertion['cost'] < cheapest_insertion['insertion']['cost']:
-            cheapest_insertion = {'node':i, 'insertion':best_i_insertion}
-                                  
     # Perform the primary cheapest insertion search until all nodes inserted
-    while node_insertions.keys():
-        # Node j to be inserted is cheapest to the current cycle
-        j = cheapest_insertion['node']
-        # Extract predecessor, successor i from the cheapest_insertion dictionary
-        i = cheapest_insertion['insertion']['pred']
-        k = cheapest_insertion['insertion']['succ']
-        # Use the slice to insert j
-        cycle = cycle[:cycle.index(i)+1] + [j] + cycle[cycle.index(i)+1:]
-        # index(i) gives the position of i in the cycle, measured from 0
-        # list(index:count) is slice notation
-        cycle_cost += cheapest_insertion['insertion']['cost']
-        # Remove j from node_insertion_costs dictionary
-        del(node_insertions[j])
-        # Update insertion costs for remaining uninserted, and find the new
-        # cheapest insertion choice
-        cheapest_insertion = {}
-        for node in node_insertions.keys():
-            # Some nodes were best inserted between i and k and must be re-evaluated
-            if node_insertions[node]['pred'] == i:
-                node_insertions[node] = fi.FindInsertionLocation(G,cycle,node)
-            # For the others, just look at new arcs (i,j) and (j,k)
+    first = cycle[0]
+    remaining = int(uninserted.sum())
+    while remaining:
+        (cost, j, i, k) = heapq.heappop(heap)
+        # Skip entries for inserted nodes, and stale entries
+        if not uninserted[j] or best_pred[j] != i or best_succ[j] != k or best_cost[j] != cost:
+            continue
+        # Insert j between i and k, labelled between them
+        succ[i] = j
+        succ[j] = k
+        cycle_nodes[m] = j
+        m += 1
+        uninserted[j] = False
+        remaining -= 1
+        cycle_cost += cost
+        if k == first:
+            label[j] = label[i] + label_gap
+        else:
+            label[j] = (label[i] + label[k]) // 2
+            if label[j] == label[i]:
+                # No room left between i and k: spread the labels out again
+                a = first
+                for p in range(m):
+                    label[a] = p*label_gap
+                    a = succ[a]
+        if not remaining:
+            break
+        nodes = np.flatnonzero(uninserted)
+        # Nodes whose best arc (i,k) was split are re-evaluated over the
+        # whole cycle, with ties going to the last arc in cycle order
+        split = nodes[best_pred[nodes] == i]
+        if len(split):
+            tails = cycle_nodes[:m]
+            heads = succ[tails]
+            arc_costs = C.costs(tails, heads)
+            tail_labels = label[tails]
+            # Evaluate blocks of nodes to limit the size of temporary arrays
+            block = max(1, 4194304 // m)
+            for start in range(0, len(split), block):
+                S = split[start:start+block]
+                delta = C.costs(tails[np.newaxis, :], S[:, np.newaxis]) + C.costs(S[:, np.newaxis], heads[np.newaxis, :]) - arc_costs[np.newaxis, :]
+                delta = delta.astype(np.float64)
+                tied = delta == delta.min(axis=1)[:, np.newaxis]
+                e = np.argmax(np.where(tied, tail_labels[np.newaxis, :], -1), axis=1)
+                best_cost[S] = delta[np.arange(len(S)), e]
+                best_pred[S] = tails[e]
+                best_succ[S] = heads[e]
+                for (node, cost, pred, succ_node) in zip(S.tolist(), best_cost[S].tolist(), tails[e].tolist(), heads[e].tolist()):
+                    heapq.heappush(heap, (cost, node, pred, succ_node))
+        # For the others, only the new arcs (i,j) and (j,k) can improve them
+        nodes = nodes[best_pred[nodes] != i]
+        ij_cost = C.costs(i, nodes) + C.costs(nodes, j) - C.cost(i, j)
+        jk_cost = C.costs(j, nodes) + C.costs(nodes, k) - C.cost(j, k)
+        use_ij = ij_cost <= jk_cost
+        new_cost = np.where(use_ij, ij_cost, jk_cost)
+        improved = np.flatnonzero(new_cost < best_cost[nodes])
+        for (node, cost, ij) in zip(nodes[improved].tolist(), new_cost[improved].tolist(), use_ij[improved].tolist()):
+            best_cost[node] = cost
+            if ij:
+                (best_pred[node], best_succ[node]) = (i, j)
+                heapq.heappush(heap, (cost, node, i, j))
             else:
-                if G[i][node]['cost'] + G[node][j]['cost'] - G[i][j]['cost'] < node_insertions[node]['cost']:
-                    node_insertions[node] = {'pred':i, 'succ':j, 'cost':G[i][node]['cost'] + G[node][j]['cost'] - G[i][j]['cost']}
-                if G[j][node]['cost'] + G[node][k]['cost'] - G[j][k]['cost'] < node_insertions[node]['cost']:
-                    node_insertions[node] = {'pred':j, 'succ':k, 'cost':G[j][node]['cost'] + G[node][k]['cost'] - G[j][k]['cost']}
-            # Update the cheapest choice                   
-            if not cheapest_insertion or node_insertions[node]['cost'] < cheapest_insertion['insertion']['cost']:
-                cheapest_insertion = {'node':node, 'insertion':node_insertions[node]}
-        
+                (best_pred[node], best_succ[node]) = (j, k)
+                heapq.heappush(heap, (cost, node, j, k))
+    
+    # Walk the linked list from the first node, using the original node names
+    cycle = [first]
+    node = int(succ[first])
+    while node != first:
+        cycle.append(node)
+        node = int(succ[node])
+    cycle = C.to_nodes(cycle + [first])
+    
     print('Cycle: %s, with cost:%s' % (str(cycle),str(cycle_cost)))
        
     return(cycle)
@@ -0,0 +1,105 @@
+# Python Code for Christofides
+#
+#
+#  ChristofidesCycle
+#
+#  a function which, given a complete graph (undirected, with costs
+#  satisfying the triangle inequality) in the networkx format, returns a
+#  cycle using the Christofides heuristic: a minimum spanning tree, plus a
+#  minimum cost perfect matching on its odd degree nodes, gives an Eulerian
+#  multigraph, and its Euler circuit is shortcut past repeated nodes.  The
+#  cycle costs at most 1.5 times the optimal cycle.  The matching step is
+#  networkx's max_weight_matching, which takes O(m^3) time on the m odd
+#  degree nodes, so this heuristic suits moderate n
+#
+#  MinSpanningTree
+#
+#  a function which returns the parent index of each node in a minimum
+#  spanning tree rooted at index 0 (-1 for the root), by Prim's algorithm
+#  with one vectorized cost row per added node: O(n^2) time, O(n) memory
+#
+#  cycles will be in node list format: [first, ..., last, first], starting
+#  from start_node if given
+#
+#  G may also be a CostMatrix (see cost_matrix.py); a networkx graph is
+#  converted to one once up front
+#
+
+# Module imports
+import networkx as nx
+import numpy as np
+import cost_matrix as cm
+
+def ChristofidesCycle(G, start_node=None):
+
+    # Convert the graph to a cost matrix once, and work with node indices
+    C = cm.AsCostMatrix(G)
+    n = len(C)
+    if n < 3:
+        cycle = C.nodes + [C.nodes[0]]
+        return(cycle)
+
+    # Minimum spanning tree edges, and the nodes of odd tree degree
+    parent = MinSpanningTree(C)
+    M = nx.MultiGraph()
+    M.add_nodes_from(range(n))
+    degree = np.zeros(n, dtype=np.int64)
+    for b in range(1, n):
+        M.add_edge(int(parent[b]), b)
+        degree[parent[b]] += 1
+        degree[b] += 1
+    odd = np.flatnonzero(degree % 2 == 1)
+
+    # Minimum cost perfect matching on the odd nodes, as a maximum weight
+    # matching of maximum cardinality with weights (largest cost - cost)
+    H = nx.Graph()
+    costs = C.costs(odd[:, np.newaxis], odd[np.newaxis, :])
+    largest = float(costs.max()) + 1
+    for (r, a) in enumerate(odd.tolist()):
+        for (s, b) in enumerate(odd.tolist()[r+1:], r+1):
+            H.add_edge(a, b, weight=largest - float(costs[r, s]))
+    mate = nx.max_weight_matching(H, maxcardinality=True)
+    # Older networkx returns a dictionary of mates, newer a set of pairs
+    if isinstance(mate, dict):
+        pairs = [(a, b) for (a, b) in mate.items() if a < b]
+    else:
+        pairs = list(mate)
+    for (a, b) in pairs:
+        M.add_edge(a, b)
+
+    # Walk the Euler circuit, skipping nodes already visited
+    start = 0
+    if start_node != None:
+        start = C.index[start_node]
+    tour = [start]
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = True
+    for (a, b) in nx.eulerian_circuit(M, source=start):
+        if not visited[b]:
+            visited[b] = True
+            tour.append(b)
+    tour.append(start)
+    cycle = C.to_nodes(tour)
+    cycle_cost = C.cycle_cost(tour)
+
+    print('Cycle: %s, with cost:%s' % (str(cycle),str(cycle_cost)))
+
+    return(cycle)
+
+# Prim's algorithm over a CostMatrix, returning the parent index array
+def MinSpanningTree(C):
+    n = len(C)
+    parent = np.zeros(n, dtype=np.int64)
+    parent[0] = -1
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[0] = True
+    # Cheapest known arc from the tree to each node
+    dist = np.array(C.row(0), dtype=np.float64)
+    for step in range(n-1):
+        b = int(np.argmin(np.where(in_tree, np.inf, dist)))
+        in_tree[b] = True
+        row = C.row(b)
+        better = ~in_tree & (row < dist)
+        dist[better] = row[better]
+        parent[better] = b
+    return(parent)
@@ -0,0 +1,104 @@
+# Python Code for Clarke-Wright Savings
+#
+#
+#  SavingsRoutes
+#
+#  a function which, given a complete graph (undirected, or with symmetric
+#  costs) in the networkx format with a 'demand' attribute on each node,
+#  and the vehicle capacity Q, returns routes using the Clarke-Wright
+#  savings heuristic.  Every customer starts on its own route out of the
+#  depot and back; joining the routes ending at customers i and j saves
+#  c(depot,i) + c(depot,j) - c(i,j).  Savings are popped from a heap,
+#  largest first, and a join is made when i and j are both still route
+#  ends (next to the depot), lie on different routes, which a union-find
+#  tracks, and the two route loads fit within Q.  Each join takes O(1)
+#  time, so the run takes O(m log m) time for m positive savings
+#
+#  Inputs:
+#
+#   G       - network in networkx format, or a CostMatrix
+#   Q       - vehicle capacity
+#   demand  - optional dictionary {node:demand}; by default the 'demand'
+#             node attributes of G.  The node with no demand is the depot
+#   k       - optional neighbor count: only the savings between each
+#             customer and its k nearest customers are candidates, so
+#             m is O(n k) rather than O(n^2).  Pass a CostOracle (see
+#             cost_oracle.py) and a small k for many thousand customers
+#
+#  routes will be in node list format: [[depot, ..., depot], ...]
+#
+
+# Module imports
+import heapq
+import numpy as np
+import cost_matrix as cm
+import greedy_edge as ge
+import vrp_tools as vt
+
+def SavingsRoutes(G, Q, demand=None, k=None):
+
+    # Convert the graph to a cost matrix once, and work with node indices
+    C = cm.AsCostMatrix(G)
+    n = len(C)
+    (depot, d) = vt.GetDemands(G, C.nodes, demand)
+    if d.max() > Q:
+        a = int(np.argmax(d))
+        raise RuntimeError('Node %s demand %s is over capacity %s' % (str(C.nodes[a]),str(d[a]),str(Q)))
+    customers = np.array([a for a in range(n) if a != depot], dtype=np.int64)
+
+    # Candidate customer pairs (a,b), a < b: all pairs, or those from the
+    # neighbor lists
+    if k == None or k >= n - 2:
+        (A, B) = np.triu_indices(n, 1)
+    else:
+        # One extra neighbor, in case the depot is among the nearest
+        N = C.neighbors(k+1)
+        A = np.repeat(np.arange(n), N.shape[1])
+        B = N.ravel()
+        (A, B) = (np.minimum(A, B), np.maximum(A, B))
+        pairs = np.unique(A*n + B)
+        (A, B) = (pairs // n, pairs % n)
+    keep = (A != depot) & (B != depot)
+    (A, B) = (A[keep], B[keep])
+
+    # Heap of positive savings, largest first
+    savings = C.costs(depot, A) + C.costs(depot, B) - C.costs(A, B)
+    positive = savings > 0
+    heap = list(zip((-savings[positive]).tolist(), A[positive].tolist(), B[positive].tolist()))
+    heapq.heapify(heap)
+
+    # Union-find over routes, with each route's load kept at its root, and
+    # the degree and customer neighbors of each node; a customer of degree
+    # below 2 is a route end, next to the depot
+    parent = list(range(n))
+    load = d.tolist()
+    degree = [0]*n
+    adj = [[] for a in range(n)]
+    while heap:
+        (saving, a, b) = heapq.heappop(heap)
+        if degree[a] == 2 or degree[b] == 2:
+            continue
+        ra = ge.Find(parent, a)
+        rb = ge.Find(parent, b)
+        if ra == rb or load[ra] + load[rb] > Q:
+            continue
+        parent[ra] = rb
+        load[rb] += load[ra]
+        degree[a] += 1
+        degree[b] += 1
+        adj[a].append(b)
+        adj[b].append(a)
+
+    # Walk each route from its lower numbered end
+    routes = []
+    done = np.zeros(n, dtype=bool)
+    for a in customers.tolist():
+        if degree[a] < 2 and not done[a]:
+            path = ge.WalkFragment(adj, a)
+            done[path] = True
+            routes.append(C.to_nodes([depot] + path + [depot]))
+    routes_cost = vt.RoutesCost(C, routes)
+
+    print('%d routes, with cost:%s' % (len(routes),str(routes_cost)))
+
+    return(routes)
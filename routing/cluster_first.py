@@ -0,0 +1,194 @@
+# Python Code for Cluster-First, Route-Second Vehicle Routing
+#
+#
+#  SweepClusters
+#
+#  a function which, given a graph in the networkx format with 'pos' and
+#  'demand' node attributes, and the vehicle capacity Q, returns clusters
+#  of customers by the sweep method: customers are sorted by polar angle
+#  around the depot, from start_angle (in radians) counterclockwise, and
+#  a new cluster starts whenever the next customer would overfill the
+#  current one.  Takes O(n log n) time
+#
+#  KMeansClusters
+#
+#  a function which returns clusters of customers by capacity-aware
+#  k-means: starting from the centroids of the sweep clusters, customers
+#  are assigned in order of decreasing demand to the nearest centroid with
+#  capacity left (opening a new cluster for a customer that fits nowhere),
+#  and the centroids are moved to the mean of their customers, until no
+#  assignment changes or max_iter rounds pass.  Each round takes O(n m log
+#  m) time for m clusters
+#
+#  RouteClusters
+#
+#  a function which sequences each cluster, with the depot, as a TSP: a
+#  construction heuristic from the depot, then an improvement heuristic,
+#  named as in the dictionaries of multi_start.py.  The clusters are
+#  routed in parallel by a pool of worker processes, each handed the cost
+#  matrix once as the pool starts, and each run only sees the small cost
+#  matrix of its own cluster
+#
+#  ClusterFirstRoutes
+#
+#  a function which clusters by method 'sweep' or 'kmeans', then routes
+#  the clusters with RouteClusters
+#
+#  Demands are read from the 'demand' node attributes of G, unless given
+#  as a dictionary {node:demand}; the node with no demand is the depot.
+#  G may also be a CostMatrix with coordinates, such as a CostOracle (see
+#  cost_oracle.py), with the demands given as a dictionary
+#
+#  clusters will be lists of customer nodes: [[customer, ...], ...]
+#  routes will be in node list format: [[depot, ..., depot], ...]
+#
+
+# Module imports
+import math
+import multiprocessing
+import numpy as np
+import cost_matrix as cm
+import spatial_index as si
+import tsp_tools as tt
+import vrp_tools as vt
+import multi_start as ms
+
+def SweepClusters(G, Q, demand=None, start_angle=0.0):
+
+    (nodes, XY, depot, d) = ClusterData(G, demand)
+    if d.max() > Q:
+        raise RuntimeError('A node demand is over capacity %s' % str(Q))
+
+    # Customers by polar angle around the depot, from start_angle
+    customers = np.array([a for a in range(len(nodes)) if a != depot], dtype=np.int64)
+    delta = XY[customers] - XY[depot]
+    angle = np.mod(np.arctan2(delta[:, 1], delta[:, 0]) - start_angle, 2*math.pi)
+    customers = customers[np.argsort(angle, kind='mergesort')]
+
+    # Fill each cluster up to capacity, in angle order
+    clusters = []
+    cluster = []
+    load = 0
+    for (a, demand_a) in zip(customers.tolist(), d[customers].tolist()):
+        if load + demand_a > Q:
+            clusters.append(cluster)
+            cluster = []
+            load = 0
+        cluster.append(nodes[a])
+        load += demand_a
+    if cluster:
+        clusters.append(cluster)
+
+    return(clusters)
+
+def KMeansClusters(G, Q, demand=None, max_iter=20):
+
+    (nodes, XY, depot, d) = ClusterData(G, demand)
+    index = dict((node, a) for (a, node) in enumerate(nodes))
+
+    # Start from the centroids of the sweep clusters
+    clusters = SweepClusters(G, Q, demand)
+    centroids = np.array([XY[[index[node] for node in cluster]].mean(axis=0) for cluster in clusters])
+
+    # Assign customers with the largest demands first
+    customers = np.array([a for a in range(len(nodes)) if a != depot], dtype=np.int64)
+    customers = customers[np.argsort(-d[customers], kind='mergesort')]
+    assign = np.full(len(nodes), -1, dtype=np.int64)
+    for iteration in range(max_iter):
+        delta = XY[customers][:, np.newaxis, :] - centroids[np.newaxis, :, :]
+        ranked = np.argsort((delta**2).sum(axis=2), axis=1)
+        load = [0]*len(centroids)
+        new_assign = np.full(len(nodes), -1, dtype=np.int64)
+        opened = []
+        for (r, a) in enumerate(customers.tolist()):
+            for c in ranked[r].tolist():
+                if load[c] + d[a] <= Q:
+                    break
+            else:
+                # Fits nowhere: open a new cluster here
+                c = len(load)
+                load.append(0)
+                opened.append(XY[a])
+            new_assign[a] = c
+            load[c] += d[a]
+        if opened:
+            centroids = np.vstack([centroids] + opened)
+        if np.array_equal(new_assign, assign):
+            break
+        assign = new_assign
+        # Move each centroid to the mean of its customers
+        for c in range(len(centroids)):
+            members = np.flatnonzero(assign == c)
+            if len(members):
+                centroids[c] = XY[members].mean(axis=0)
+
+    clusters = [[nodes[a] for a in np.flatnonzero(assign == c)] for c in range(len(centroids))]
+    return([cluster for cluster in clusters if cluster])
+
+def RouteClusters(G, clusters, demand=None, construction_name='nearest_neighbor', improvement_name='two_opt', processes=None):
+
+    # Convert the graph to a cost matrix once, for all clusters
+    C = cm.AsCostMatrix(G)
+    (depot, d) = vt.GetDemands(G, C.nodes, demand)
+    if construction_name not in ms.constructions:
+        raise RuntimeError('Unknown construction heuristic %s; choose from %s' % (str(construction_name),str(sorted(ms.constructions.keys()))))
+    if improvement_name not in ms.improvements:
+        raise RuntimeError('Unknown improvement heuristic %s; choose from %s' % (str(improvement_name),str(sorted(ms.improvements.keys(), key=str))))
+
+    # One task per cluster, as the depot and customer indices
+    tasks = [([depot] + C.to_indices(cluster), construction_name, improvement_name) for cluster in clusters]
+
+    # Forked workers inherit the cost matrix from this process; otherwise
+    # it is sent once to each worker as the pool starts
+    get_start_method = getattr(multiprocessing, 'get_start_method', lambda: 'fork')
+    if get_start_method() == 'fork':
+        ms.worker_costs = C
+        pool = multiprocessing.Pool(processes, ms.InitWorker, (None,))
+    else:
+        pool = multiprocessing.Pool(processes, ms.InitWorker, (C,))
+    try:
+        # Hand out several clusters at a time to keep all workers busy
+        chunksize = max(1, len(tasks) // (4*(processes or multiprocessing.cpu_count())))
+        results = pool.map(RouteTask, tasks, chunksize)
+    finally:
+        pool.close()
+        pool.join()
+        ms.worker_costs = None
+
+    routes = [C.to_nodes(idx_route) for idx_route in results]
+    routes_cost = vt.RoutesCost(C, routes)
+
+    print('%d routes, with cost:%s' % (len(routes),str(routes_cost)))
+
+    return(routes)
+
+def ClusterFirstRoutes(G, Q, demand=None, method='sweep', construction_name='nearest_neighbor', improvement_name='two_opt', processes=None):
+
+    if method == 'sweep':
+        clusters = SweepClusters(G, Q, demand)
+    elif method == 'kmeans':
+        clusters = KMeansClusters(G, Q, demand)
+    else:
+        raise RuntimeError('Unknown clustering method %s; choose from %s' % (str(method),str(['kmeans', 'sweep'])))
+    return(RouteClusters(G, clusters, demand, construction_name, improvement_name, processes))
+
+# Return the node list, coordinates, depot index and demand array for G
+def ClusterData(G, demand):
+    (nodes, XY) = si.GetCoords(G)
+    (depot, d) = vt.GetDemands(G, nodes, demand)
+    return(nodes, XY, depot, d)
+
+# Sequence one cluster in a worker, returning its route as indices into
+# the full cost matrix, from the depot and back
+def RouteTask(task):
+    (idx_nodes, construction, improvement) = task
+    C = ms.worker_costs
+    if len(idx_nodes) <= 3:
+        return(idx_nodes + [idx_nodes[0]])
+    # The cluster's own cost matrix, over positions in idx_nodes
+    idx = np.array(idx_nodes, dtype=np.int64)
+    S = cm.CostMatrix(list(range(len(idx))), C.costs(idx[:, np.newaxis], idx[np.newaxis, :]))
+    cycle = ms.constructions[construction](S, 0)
+    cycle = ms.improvements[improvement](S, cycle)
+    cycle = tt.ReorderCycle(cycle, 0)
+    return([idx_nodes[p] for p in cycle])
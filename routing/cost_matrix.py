@@ -0,0 +1,211 @@
+# Python Code for Dense Cost Matrices
+#
+#
+#  CostMatrix
+#
+#  a class which stores the arc costs of a complete graph (directed or
+#  undirected) as a contiguous NumPy array, together with a map from node
+#  names to row/column indices.  Heuristics convert a networkx graph into
+#  a CostMatrix once, and then work with integer node indices instead of
+#  looking up G[i][j]['cost'] on every access
+#
+#  Costs are always read through the methods cost(a,b) for a single arc,
+#  costs(A,B) for arrays of tails and heads, and row(a) for all arcs out
+#  of a, where a and b are node indices, not node names.  neighbors(k)
+#  builds the k nearest neighbor lists used to restrict local searches,
+#  and insertion_locations(...) finds the cheapest insertion arcs for many
+#  nodes at once
+#
+#  CostMatrixFromGraph
+#
+#  a function which builds a CostMatrix from a graph in the networkx
+#  format, using the 'cost' edge attribute.  Missing arcs cost infinity
+#
+#  CostMatrixFromCoords
+#
+#  a function which builds a CostMatrix of Euclidean distances from a
+#  dictionary of node coordinates {node:(x,y)}
+#
+#  AsCostMatrix
+#
+#  a function which returns its input if it is already a CostMatrix, and
+#  otherwise converts the networkx graph once up front
+#
+
+# Module imports
+import numpy as np
+
+class CostMatrix(object):
+    """ A class for storing arc costs as a dense array indexed by node position """
+    # How the CostMatrix object represents itself to others
+    def __repr__(self):
+        return('CostMatrix(%d nodes, %s)' % (len(self.nodes), str(self.C.dtype)))
+
+    # Construct with the list of node names, and a square array of costs
+    # with C[a,b] the cost of the arc from nodes[a] to nodes[b]
+    def __init__(self, nodes, C, coords=None):
+        self.nodes = list(nodes)
+        self.index = dict((node, a) for (a, node) in enumerate(self.nodes))
+        if len(self.index) != len(self.nodes):
+            raise RuntimeError('Cost matrix node names must be unique.')
+        self.C = np.ascontiguousarray(C)
+        if self.C.shape != (len(self.nodes), len(self.nodes)):
+            raise RuntimeError('Cost matrix must be %d x %d, not %s' % (len(self.nodes), len(self.nodes), str(self.C.shape)))
+        # Node coordinates (an n x 2 array), if they are known
+        self.coords = coords
+
+    # Implements the len() function to give the node count
+    def __len__(self):
+        return(len(self.nodes))
+
+    # Cost of the single arc from index a to index b, as a python float
+    def cost(self, a, b):
+        return(self.C.item(a, b))
+
+    # Costs of the arcs from A[k] to B[k], for index arrays A and B
+    def costs(self, A, B):
+        return(self.C[A, B])
+
+    # Costs of all arcs leaving index a
+    def row(self, a):
+        return(self.C[a])
+
+    # Find the (a,b) pair of distinct indices with the cheapest arc, or with the
+    # most expensive finite arc if largest is True
+    def extreme_arc(self, largest=False):
+        n = len(self.nodes)
+        best_arc = None
+        best_cost = None
+        # Scan blocks of rows to limit the size of temporary arrays
+        block = 256
+        for start in range(0, n, block):
+            A = np.arange(start, min(start+block, n))
+            costs = self.costs(A[:, np.newaxis], np.arange(n)[np.newaxis, :]).astype(np.float64)
+            # Never pair a node with itself, or choose a missing arc
+            costs[~np.isfinite(costs)] = np.nan
+            costs[np.arange(len(A)), A] = np.nan
+            if np.isnan(costs).all():
+                continue
+            if largest:
+                flat = np.nanargmax(costs)
+            else:
+                flat = np.nanargmin(costs)
+            (r, b) = np.unravel_index(flat, costs.shape)
+            if best_arc is None or (largest and costs[r, b] > best_cost) or (not largest and costs[r, b] < best_cost):
+                best_arc = (int(A[r]), int(b))
+                best_cost = costs[r, b]
+        return(best_arc)
+
+    # Build neighbor lists: row a holds the k indices b != a with the
+    # cheapest arcs (a,b), sorted by increasing cost
+    def neighbors(self, k):
+        n = len(self.nodes)
+        k = min(k, n-1)
+        N = np.empty((n, k), dtype=np.int64)
+        if k <= 0:
+            return(N)
+        # Scan blocks of rows to limit the size of temporary arrays
+        block = 256
+        for start in range(0, n, block):
+            A = np.arange(start, min(start+block, n))
+            costs = self.costs(A[:, np.newaxis], np.arange(n)[np.newaxis, :]).astype(np.float64)
+            costs[np.arange(len(A)), A] = np.inf
+            # Partition out the k cheapest, then sort just those
+            part = np.argpartition(costs, k-1, axis=1)[:, :k]
+            order = np.argsort(np.take_along_axis(costs, part, axis=1), axis=1)
+            N[A] = np.take_along_axis(part, order, axis=1)
+        return(N)
+
+    # Convert a list of node names to a list of indices
+    def to_indices(self, nodes):
+        try:
+            return([self.index[node] for node in nodes])
+        except KeyError as err:
+            raise RuntimeError('Node %s not in cost matrix.' % str(err.args[0]))
+
+    # Convert a sequence of indices back to a list of node names
+    def to_nodes(self, indices):
+        return([self.nodes[a] for a in indices])
+
+    # Compute the cost of a cycle (or path) given as a list of indices
+    def cycle_cost(self, idx_cycle):
+        if len(idx_cycle) < 2:
+            return(0)
+        idx_cycle = np.asarray(idx_cycle)
+        return(float(self.costs(idx_cycle[:-1], idx_cycle[1:]).sum()))
+
+    # Find the cheapest insertion arc for every index in J at once, over the
+    # arcs (tails[e], heads[e]).  Returns arrays of the best arc positions e
+    # and their insertion costs; ties go to the last arc.  If sizes and
+    # slacks are given, J[j] may only go on arc e when sizes[j] <= slacks[e],
+    # and a J[j] that fits nowhere gets position -1 and cost infinity
+    def insertion_locations(self, tails, heads, J, sizes=None, slacks=None):
+        tails = np.asarray(tails)
+        heads = np.asarray(heads)
+        J = np.asarray(J)
+        m = len(tails)
+        best = np.full(len(J), -1, dtype=np.int64)
+        best_cost = np.full(len(J), np.inf)
+        if m == 0:
+            return(best, best_cost)
+        arc_costs = self.costs(tails, heads)
+        # Evaluate blocks of candidates to limit the size of temporary arrays
+        block = max(1, 4194304 // m)
+        for start in range(0, len(J), block):
+            Jb = J[start:start+block]
+            delta = self.costs(tails[np.newaxis, :], Jb[:, np.newaxis]) + self.costs(Jb[:, np.newaxis], heads[np.newaxis, :]) - arc_costs[np.newaxis, :]
+            delta = delta.astype(np.float64)
+            if sizes is not None:
+                delta[np.asarray(sizes)[start:start+block, np.newaxis] > np.asarray(slacks)[np.newaxis, :]] = np.inf
+            e = m - 1 - np.argmin(delta[:, ::-1], axis=1)
+            cost = delta[np.arange(len(Jb)), e]
+            fits = np.isfinite(cost)
+            best[start:start+block] = np.where(fits, e, -1)
+            best_cost[start:start+block] = cost
+        return(best, best_cost)
+
+    # Find minimum cost insertion location for index j to a cycle of indices,
+    # returned as {'pred':a, 'succ':b, 'cost':cost} in index terms
+    def insertion_location(self, idx_cycle, j):
+        tails = np.asarray(idx_cycle[:-1])
+        heads = np.asarray(idx_cycle[1:])
+        delta = self.costs(tails, j) + self.costs(j, heads) - self.costs(tails, heads)
+        # Ties go to the last arc, as in FindInsertionLocation
+        best = len(delta) - 1 - int(np.argmin(delta[::-1]))
+        return({'pred':int(tails[best]), 'succ':int(heads[best]), 'cost':float(delta[best])})
+
+
+# Build a CostMatrix from a networkx graph using the 'cost' edge attribute
+def CostMatrixFromGraph(G, dtype=np.float64):
+    nodes = list(G.nodes())
+    index = dict((node, a) for (a, node) in enumerate(nodes))
+    C = np.full((len(nodes), len(nodes)), np.inf, dtype=dtype)
+    np.fill_diagonal(C, 0)
+    # Undirected edges are reported once, but cost the same both ways
+    directed = G.is_directed()
+    for (i, j, attr) in G.edges(data=True):
+        try:
+            C[index[i], index[j]] = attr['cost']
+            if not directed:
+                C[index[j], index[i]] = attr['cost']
+        except KeyError:
+            raise RuntimeError('Each arc must have a cost attribute. Check (%s, %s)' % (str(i),str(j)) )
+    return(CostMatrix(nodes, C))
+
+# Build a CostMatrix of Euclidean distances from {node:(x,y)} coordinates
+def CostMatrixFromCoords(coords, dtype=np.float64):
+    nodes = list(coords.keys())
+    XY = np.array([coords[node] for node in nodes], dtype=np.float64)
+    # Fill row blocks to limit the size of the temporary difference arrays
+    C = np.empty((len(nodes), len(nodes)), dtype=dtype)
+    block = 1024
+    for start in range(0, len(nodes), block):
+        diff = XY[start:start+block, np.newaxis, :] - XY[np.newaxis, :, :]
+        C[start:start+block] = np.sqrt((diff**2).sum(axis=2))
+    return(CostMatrix(nodes, C, coords=XY))
+
+# Return G itself if already a CostMatrix, otherwise convert it once
+def AsCostMatrix(G, dtype=np.float64):
+    if isinstance(G, CostMatrix):
+        return(G)
+    return(CostMatrixFromGraph(G, dtype))
@@ -0,0 +1,118 @@
+# Python Code for Coordinate Cost Oracles
+#
+#
+#  CostOracle
+#
+#  a CostMatrix which stores only node coordinates, and computes each arc
+#  cost when it is asked for, so that no n x n array (and no complete
+#  networkx graph) is ever built.  Costs are Euclidean distances between
+#  (x,y) coordinates, or great-circle (haversine) distances in kilometers
+#  between (longitude,latitude) coordinates in degrees.  Single arc costs
+#  can be kept in a bounded least-recently-used cache of cache_size arcs
+#
+#  Any heuristic which takes a CostMatrix accepts a CostOracle in place of
+#  the networkx graph G
+#
+#  CostOracleFromCoords
+#
+#  a function which builds a CostOracle from a dictionary of node
+#  coordinates {node:(x,y)}
+#
+#  CostOracleFromGraph
+#
+#  a function which builds a CostOracle from the 'pos' node attributes of
+#  a graph in the networkx format; the graph needs no edges
+#
+
+# Module imports
+import math
+from collections import OrderedDict
+import numpy as np
+import cost_matrix as cm
+import spatial_index as si
+
+# Mean radius of the earth in kilometers, for haversine distances
+earth_radius = 6371.0
+
+class CostOracle(cm.CostMatrix):
+    """ A class for computing arc costs on demand from node coordinates """
+    # How the CostOracle object represents itself to others
+    def __repr__(self):
+        return('CostOracle(%d nodes, %s, cache %d of %d)' % (len(self.nodes), self.metric, len(self.cache), self.cache_size))
+
+    # Construct with the list of node names, an n x 2 array of coordinates,
+    # the metric ('euclidean' or 'haversine'), and the cache size in arcs
+    def __init__(self, nodes, coords, metric='euclidean', cache_size=0):
+        self.nodes = list(nodes)
+        self.index = dict((node, a) for (a, node) in enumerate(self.nodes))
+        if len(self.index) != len(self.nodes):
+            raise RuntimeError('Cost matrix node names must be unique.')
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        if len(self.coords) != len(self.nodes):
+            raise RuntimeError('Cost oracle needs %d coordinate pairs, not %d' % (len(self.nodes), len(self.coords)))
+        if metric not in ('euclidean', 'haversine'):
+            raise RuntimeError('Unknown metric %s; use euclidean or haversine' % str(metric))
+        self.metric = metric
+        # No cost array is stored
+        self.C = None
+        # Python lists for fast single arc costs; haversine works in radians
+        if metric == 'haversine':
+            XY = np.radians(self.coords)
+        else:
+            XY = self.coords
+        self.xs = XY[:, 0].tolist()
+        self.ys = XY[:, 1].tolist()
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    # Cost of the single arc from index a to index b, as a python float
+    def cost(self, a, b):
+        if not self.cache_size:
+            return(self.arc_cost(a, b))
+        # Costs are symmetric, so both directions share one cache entry
+        key = (a, b) if a < b else (b, a)
+        cost = self.cache.pop(key, None)
+        if cost == None:
+            cost = self.arc_cost(a, b)
+            if len(self.cache) >= self.cache_size:
+                # Evict the least recently used arc
+                self.cache.popitem(last=False)
+        # Reinsert as the most recently used arc
+        self.cache[key] = cost
+        return(cost)
+
+    # Compute the cost of the single arc from index a to index b
+    def arc_cost(self, a, b):
+        if self.metric == 'euclidean':
+            return(math.hypot(self.xs[a] - self.xs[b], self.ys[a] - self.ys[b]))
+        (lon1, lat1, lon2, lat2) = (self.xs[a], self.ys[a], self.xs[b], self.ys[b])
+        h = math.sin((lat2 - lat1)/2)**2 + math.cos(lat1)*math.cos(lat2)*math.sin((lon2 - lon1)/2)**2
+        return(2*earth_radius*math.asin(min(1.0, math.sqrt(h))))
+
+    # Costs of the arcs from A[k] to B[k], for index arrays A and B, computed
+    # in one vectorized pass
+    def costs(self, A, B):
+        (A, B) = np.broadcast_arrays(np.asarray(A), np.asarray(B))
+        if self.metric == 'euclidean':
+            dX = self.coords[A, 0] - self.coords[B, 0]
+            dY = self.coords[A, 1] - self.coords[B, 1]
+            return(np.sqrt(dX*dX + dY*dY))
+        (lon1, lat1) = (np.radians(self.coords[A, 0]), np.radians(self.coords[A, 1]))
+        (lon2, lat2) = (np.radians(self.coords[B, 0]), np.radians(self.coords[B, 1]))
+        h = np.sin((lat2 - lat1)/2)**2 + np.cos(lat1)*np.cos(lat2)*np.sin((lon2 - lon1)/2)**2
+        return(2*earth_radius*np.arcsin(np.minimum(1.0, np.sqrt(h))))
+
+    # Costs of all arcs leaving index a
+    def row(self, a):
+        return(self.costs(a, np.arange(len(self.nodes))))
+
+
+# Build a CostOracle from {node:(x,y)} coordinates
+def CostOracleFromCoords(coords, metric='euclidean', cache_size=0):
+    nodes = list(coords.keys())
+    return(CostOracle(nodes, [coords[node] for node in nodes], metric, cache_size))
+
+# Build a CostOracle from the 'pos' node attributes of a networkx graph
+def CostOracleFromGraph(G, metric='euclidean', cache_size=0):
+    (nodes, XY) = si.GetCoords(G)
+    return(CostOracle(nodes, XY, metric, cache_size))
@@ -10,11 +10,40 @@
 #
 #  suppose input cycle = [first, ..., last, first]
 #
+#  FindInsertionLocations
+#
+#  the same search for many nodes at once: given a cycle and a list of
+#  insert_nodes, returns a dictionary of best insertions keyed by node,
+#  {node:{'pred':i, 'succ':j, 'cost':cost}}, computed together from a
+#  cost matrix
+#
+#  FindRouteInsertionLocations
+#
+#  the same search over several routes (VRP routes in the format
+#  [depot, ..., depot]) at once, returning {node:{'route':r, 'pred':i,
+#  'succ':j, 'cost':cost}} where r is the position of the route in the
+#  routes list.  If vehicle capacity Q is given, a node may only go on a
+#  route when the route's total 'demand' plus its own stays within Q;
+#  nodes that fit on no route map to None.  Demands are read from the
+#  'demand' node attributes of G, or from an optional dictionary
+#  {node:demand}, which is required when G is a CostMatrix
+#
+#  For the batched functions, G may also be a CostMatrix (see
+#  cost_matrix.py); pass one when calling them repeatedly, since a networkx
+#  graph is converted on every call
 #
 
 import networkx as nx
+import numpy as np
+import cost_matrix as cm
 
 def FindInsertionLocation(G, cycle, insert_node):
+    # With a CostMatrix, search all cycle arcs at once
+    if isinstance(G, cm.CostMatrix):
+        best_insertion = G.insertion_location(G.to_indices(cycle), G.index[insert_node])
+        best_insertion['pred'] = G.nodes[best_insertion['pred']]
+        best_insertion['succ'] = G.nodes[best_insertion['succ']]
+        return(best_insertion)
 
     # Initialize
     best_insertion = {}
@@ -30,4 +59,62 @@ def FindInsertionLocation(G, cycle, insert_node):
         # Iterate forward
         i = k
         
-    return(best_insertion)
\ No newline at end of file
+    return(best_insertion)
+
+def FindInsertionLocations(G, cycle, insert_nodes):
+
+    # Convert the graph to a cost matrix, and work with node indices
+    C = cm.AsCostMatrix(G)
+    idx_cycle = C.to_indices(cycle)
+    
+    # Evaluate every node against every cycle arc together
+    (best, best_cost) = C.insertion_locations(idx_cycle[:-1], idx_cycle[1:], C.to_indices(insert_nodes))
+    
+    best_insertions = {}
+    for (node, e, cost) in zip(insert_nodes, best.tolist(), best_cost.tolist()):
+        best_insertions[node] = {'pred':cycle[e], 'succ':cycle[e+1], 'cost':cost}
+        
+    return(best_insertions)
+
+def FindRouteInsertionLocations(G, routes, insert_nodes, Q=None, demand=None):
+
+    # Node demands come from the 'demand' node attributes, unless given
+    # as a dictionary {node:demand}
+    if Q != None and demand == None:
+        if isinstance(G, cm.CostMatrix):
+            raise RuntimeError('Demands must be given as a dictionary with a cost matrix.')
+        demand = dict((i, attr['demand']) for (i, attr) in G.nodes(data=True))
+    
+    # Convert the graph to a cost matrix, and work with node indices
+    C = cm.AsCostMatrix(G)
+    
+    # Gather the arcs of all routes, remembering the route and position
+    # of each arc, and the slack capacity of its route
+    tails = []
+    heads = []
+    arcs = []
+    slacks = []
+    for (r, route) in enumerate(routes):
+        idx_route = C.to_indices(route)
+        tails += idx_route[:-1]
+        heads += idx_route[1:]
+        arcs += [(r, p) for p in range(len(route)-1)]
+        if Q != None:
+            slacks += [Q - sum(demand[i] for i in route[1:-1])]*(len(route)-1)
+    
+    # Evaluate every node against every route arc together
+    if Q != None:
+        sizes = [demand[i] for i in insert_nodes]
+        (best, best_cost) = C.insertion_locations(tails, heads, C.to_indices(insert_nodes), sizes, slacks)
+    else:
+        (best, best_cost) = C.insertion_locations(tails, heads, C.to_indices(insert_nodes))
+    
+    best_insertions = {}
+    for (node, e, cost) in zip(insert_nodes, best.tolist(), best_cost.tolist()):
+        if e == -1:
+            best_insertions[node] = None
+        else:
+            (r, p) = arcs[e]
+            best_insertions[node] = {'route':r, 'pred':routes[r][p], 'succ':routes[r][p+1], 'cost':cost}
+            
+    return(best_insertions)
@@ -0,0 +1,119 @@
+# Python Code for Greedy Edge
+#
+#
+#  GreedyEdgeCycle
+#
+#  a function which, given a complete graph (undirected, or with symmetric
+#  costs) in the networkx format, returns a cycle using the greedy edge
+#  (greedy matching) heuristic: candidate edges are scanned from cheapest
+#  to most expensive, and an edge is kept when both its ends still have
+#  degree below 2 and it joins two different fragments, which a union-find
+#  tracks.  Only the edges from each node to its k nearest neighbors are
+#  candidates, so the scan takes O(n k log(n k)) time.  The path fragments
+#  left at the end are joined nearest endpoint first into one cycle
+#
+#  cycles will be in node list format: [first, ..., last, first], starting
+#  from start_node if given
+#
+#  G may also be a CostMatrix (see cost_matrix.py); a networkx graph is
+#  converted to one once up front
+#
+
+# Module imports
+import numpy as np
+import cost_matrix as cm
+
+def GreedyEdgeCycle(G, k=10, start_node=None):
+
+    # Convert the graph to a cost matrix once, and work with node indices
+    C = cm.AsCostMatrix(G)
+    n = len(C)
+    if n < 3:
+        cycle = C.nodes + [C.nodes[0]]
+        return(cycle)
+
+    # Candidate edges (a,b), a < b, from the neighbor lists, cheapest first
+    N = C.neighbors(k)
+    A = np.repeat(np.arange(n), N.shape[1])
+    B = N.ravel()
+    (A, B) = (np.minimum(A, B), np.maximum(A, B))
+    pairs = np.unique(A*n + B)
+    (A, B) = (pairs // n, pairs % n)
+    order = np.argsort(C.costs(A, B), kind='mergesort')
+
+    # Union-find over fragments, with the degree and neighbors of each node
+    parent = list(range(n))
+    degree = [0]*n
+    adj = [[] for a in range(n)]
+    edges = 0
+    for (a, b) in zip(A[order].tolist(), B[order].tolist()):
+        if degree[a] == 2 or degree[b] == 2:
+            continue
+        ra = Find(parent, a)
+        rb = Find(parent, b)
+        if ra == rb:
+            continue
+        parent[ra] = rb
+        degree[a] += 1
+        degree[b] += 1
+        adj[a].append(b)
+        adj[b].append(a)
+        edges += 1
+        if edges == n - 1:
+            break
+
+    # Each path fragment (a single node is one too) runs between two
+    # endpoints of degree below 2; find the far end of each
+    far_end = {}
+    for a in range(n):
+        if degree[a] < 2 and a not in far_end:
+            path = WalkFragment(adj, a)
+            far_end[a] = path[-1]
+            far_end[path[-1]] = a
+
+    # Join the fragments: from the far end of the last fragment, go to the
+    # nearest endpoint of a fragment not yet in the tour
+    open_end = np.zeros(n, dtype=bool)
+    open_end[list(far_end.keys())] = True
+    first = min(far_end.keys())
+    tour = []
+    e = first
+    while True:
+        path = WalkFragment(adj, e)
+        tour.extend(path)
+        open_end[e] = False
+        open_end[far_end[e]] = False
+        if not open_end.any():
+            break
+        row = np.where(open_end, C.row(path[-1]), np.inf)
+        e = int(np.argmin(row))
+
+    # Start the cycle from start_node if given
+    if start_node != None:
+        s = tour.index(C.index[start_node])
+        tour = tour[s:] + tour[:s]
+    tour.append(tour[0])
+    cycle = C.to_nodes(tour)
+    cycle_cost = C.cycle_cost(tour)
+
+    print('Cycle: %s, with cost:%s' % (str(cycle),str(cycle_cost)))
+
+    return(cycle)
+
+# Find the root of a's fragment, halving paths along the way
+def Find(parent, a):
+    while parent[a] != a:
+        parent[a] = parent[parent[a]]
+        a = parent[a]
+    return(a)
+
+# List the nodes of the path fragment starting at endpoint a
+def WalkFragment(adj, a):
+    path = [a]
+    prev = -1
+    while True:
+        step = [b for b in adj[path[-1]] if b != prev]
+        if not step:
+            return(path)
+        prev = path[-1]
+        path.append(step[0])
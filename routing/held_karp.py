@@ -0,0 +1,151 @@
+# Python Code for the Held-Karp Lower Bound
+#
+#
+#  HeldKarpBound
+#
+#  a function which, given a complete graph (undirected, or with symmetric
+#  costs) in the networkx format, returns a lower bound on the cost of any
+#  cycle through all nodes: the Held-Karp 1-tree bound, improved by
+#  subgradient optimization of node penalties pi.  A 1-tree is a minimum
+#  spanning tree on all nodes but the first, plus the two cheapest arcs
+#  from the first node; with costs c(i,j) + pi(i) + pi(j), its cost less
+#  2*sum(pi) bounds the optimal cycle cost for every pi.  Each subgradient
+#  step raises the penalties of nodes with 1-tree degree above 2, and
+#  lowers those with degree 1.  The step size uses the cost of init_cycle
+#  (or of a greedy edge cycle) as the target, and halves whenever the bound
+#  stalls.  Results are returned as a dictionary:
+#
+#   {'bound':lower bound, 'pi':{node:penalty}, 'iterations':count,
+#    'seconds':run time, 'optimal':True if the 1-tree is a cycle}
+#
+#  Each 1-tree takes O(n^2) time and O(n) memory, by Prim's algorithm with
+#  one vectorized cost row per added node.  The search stops early once
+#  time_limit seconds pass
+#
+#  OptimalityGap
+#
+#  a function which reports the relative gap between the cost of a cycle
+#  and a lower bound (the Held-Karp bound unless one is given), as a
+#  dictionary {'cost':cycle cost, 'bound':lower bound, 'gap':(cost -
+#  bound)/bound}
+#
+#  G may also be a CostMatrix (see cost_matrix.py); a networkx graph is
+#  converted to one once up front
+#
+
+# Module imports
+import time
+import numpy as np
+import cost_matrix as cm
+import tsp_tools as tt
+import greedy_edge as ge
+
+# Zero tolerance
+zero = 0.000001
+
+# Iterations without improvement before the step size is halved
+stall_period = 10
+
+def HeldKarpBound(G, init_cycle=None, max_iter=300, time_limit=None):
+
+    # Start the clock
+    start_time = time.time()
+
+    # Convert the graph to a cost matrix once, and work with node indices
+    C = cm.AsCostMatrix(G)
+    n = len(C)
+    if n < 3:
+        raise RuntimeError('Held-Karp bound needs at least 3 nodes.')
+
+    # Target for the step size: the cost of a known cycle
+    if init_cycle == None:
+        init_cycle = ge.GreedyEdgeCycle(C)
+    upper_bound = tt.CycleCost(C, init_cycle)
+
+    pi = np.zeros(n)
+    best_bound = -np.inf
+    best_pi = pi.copy()
+    step_scale = 2.0
+    stall = 0
+    optimal = False
+    iterations = 0
+
+    while iterations < max_iter:
+        if time_limit != None and time.time() - start_time > time_limit:
+            break
+        iterations += 1
+        (bound, degree) = OneTree(C, pi)
+        if bound > best_bound + zero:
+            best_bound = bound
+            best_pi = pi.copy()
+            stall = 0
+        else:
+            stall += 1
+            if stall >= stall_period:
+                step_scale = step_scale/2
+                stall = 0
+        # A 1-tree with every degree 2 is a cycle, and so optimal
+        subgradient = degree - 2
+        norm = float((subgradient*subgradient).sum())
+        if norm == 0:
+            optimal = True
+            break
+        if upper_bound - best_bound <= zero or step_scale < zero:
+            break
+        step = step_scale*(upper_bound - bound)/norm
+        pi = pi + step*subgradient
+
+    seconds = time.time() - start_time
+    print('Held-Karp bound: %s, after %d iterations in %.2f seconds' % (str(best_bound),iterations,seconds))
+
+    return({'bound':best_bound, 'pi':dict(zip(C.nodes, best_pi.tolist())), 'iterations':iterations, 'seconds':seconds, 'optimal':optimal})
+
+def OptimalityGap(G, cycle, bound=None):
+
+    C = cm.AsCostMatrix(G)
+    cycle_cost = tt.CycleCost(C, cycle)
+    if bound == None:
+        bound = HeldKarpBound(C, cycle)['bound']
+    gap = (cycle_cost - bound)/bound
+
+    print('Cycle cost: %s, lower bound: %s, gap: %.2f%%' % (str(cycle_cost),str(bound),100*gap))
+
+    return({'cost':cycle_cost, 'bound':bound, 'gap':gap})
+
+# Compute the penalized 1-tree for penalties pi, returning its cost less
+# 2*sum(pi), and the degree of each node index in the 1-tree
+def OneTree(C, pi):
+    n = len(C)
+    degree = np.zeros(n, dtype=np.int64)
+
+    # Minimum spanning tree over indices 1, ..., n-1, grown from index 1.
+    # Nodes in the tree get infinite penalties in open_pi, so that their
+    # arc costs never beat dist; index 0 is kept out of the tree this way
+    open_pi = pi.copy()
+    open_pi[0] = np.inf
+    open_pi[1] = np.inf
+    dist = C.row(1) + pi[1] + open_pi
+    parent = np.ones(n, dtype=np.int64)
+    better = np.empty(n, dtype=bool)
+    tree_cost = 0.0
+    for step in range(n-2):
+        b = int(np.argmin(dist))
+        tree_cost += dist[b]
+        degree[b] += 1
+        degree[parent[b]] += 1
+        open_pi[b] = np.inf
+        dist[b] = np.inf
+        row = C.row(b) + (pi[b] + open_pi)
+        np.less(row, dist, out=better)
+        np.copyto(dist, row, where=better)
+        np.copyto(parent, b, where=better)
+
+    # The two cheapest arcs from index 0
+    row = C.row(0) + pi[0] + pi
+    row[0] = np.inf
+    two = np.argpartition(row, 1)[:2]
+    tree_cost += float(row[two].sum())
+    degree[0] = 2
+    degree[two] += 1
+
+    return(tree_cost - 2*float(pi.sum()), degree)
@@ -0,0 +1,129 @@
+# Python Code for Lin-Kernighan
+#
+#
+#  LinKernighanCycle
+#
+#  a function which, given a complete graph (directed or undirected) in the
+#  networkx format, and an initial cycle, returns a cycle improved by a
+#  variable-depth Lin-Kernighan search.  Each LK move is built as a chain of
+#  2-exchanges from a base node t1: the arc (t1,t2) is removed, a new arc
+#  (t2,t3) to a near neighbor t3 is added, and an arc (t3,t4) is removed so
+#  that closing with (t4,t1) gives a cycle.  The chain continues from t4
+#  while the running gain stays positive, and the cycle is rolled back to
+#  the best closed cycle seen along the chain.  When no LK move improves at
+#  a node, the Or-exchanges of or_opt are tried there (LK-2.5/Or-3opt)
+#
+#  The search stops early once time_limit seconds pass.  If trajectory is a
+#  list, (seconds, cost) pairs are appended to it at the start and after
+#  each improvement
+#
+#  cycles will be in node list format: [first, ..., last, first]
+#
+#  G may also be a CostMatrix (see cost_matrix.py); a networkx graph is
+#  converted to one once up front.  Costs are assumed symmetric
+#
+
+# Module imports
+import or_opt as oo
+
+# Zero tolerance
+zero = 0.000001
+
+# Deepest chain of 2-exchanges in one LK move
+max_depth = 50
+
+# Number of t3 choices tried at the first level of the chain; deeper
+# levels take only the best choice
+breadth = 5
+
+def LinKernighanCycle(G, init_cycle=None, k=8, time_limit=None, trajectory=None):
+    return(oo.LocalSearchCycle(G, init_cycle, k, [LKNodeMove, oo.OrOptNodeMove], time_limit, trajectory))
+
+# Find and make the first improving LK move with base node index a.  Returns
+# the savings, and the nodes whose cycle arcs changed
+def LKNodeMove(C, tour, a, neighbors, neighbor_costs):
+
+    # Initial exchange finds no savings
+    exchange = {'savings':0}
+    t1 = a
+
+    # Remove the arc to the successor, then to the predecessor
+    for t2 in (tour.next(t1), tour.prev(t1)):
+        # First level choices of t3, best first
+        first_choices = LKChoices(C, tour, t1, t2, C.cost(t1, t2), neighbors, neighbor_costs, set())
+        for (first_gain, t3, t4) in first_choices[:breadth]:
+            savings = LKChain(C, tour, t1, t2, t3, t4, neighbors, neighbor_costs)
+            if savings['savings'] > zero:
+                return(savings)
+        # Nothing found from this t2; the cycle was rolled back
+
+    return(exchange)
+
+# List the (gain, t3, t4) choices for extending a chain whose open end is
+# t2, with running gain g, best first.  Added arcs may not be removed again
+def LKChoices(C, tour, t1, t2, g, neighbors, neighbor_costs, added):
+    choices = []
+    # Removed arc (t3,t4) has t4 on the same side of t3 as t1 is of t2
+    forward = (tour.next(t1) == t2)
+    t2_next = tour.next(t2)
+    t2_prev = tour.prev(t2)
+    for (t3, cost23) in zip(neighbors[t2], neighbor_costs[t2]):
+        # The running gain must stay positive after adding (t2,t3)
+        if cost23 >= g:
+            break
+        if t3 == t1 or t3 == t2_next or t3 == t2_prev:
+            continue
+        if forward:
+            t4 = tour.prev(t3)
+        else:
+            t4 = tour.next(t3)
+        if (min(t3, t4), max(t3, t4)) in added:
+            continue
+        # Prefer the choice that also removes an expensive arc (t3,t4)
+        choices.append((g - cost23 + C.cost(t3, t4), t3, t4))
+    choices.sort(reverse=True)
+    return(choices)
+
+# Grow an LK chain from a first choice of t3 and t4, keeping the best
+# closed cycle found along the way and rolling back the rest
+def LKChain(C, tour, t1, t2, t3, t4, neighbors, neighbor_costs):
+
+    # Initial exchange finds no savings
+    exchange = {'savings':0}
+
+    # Running gain: removed arc costs minus added arc costs, before closing
+    g = C.cost(t1, t2)
+    flips = []
+    added = set()
+    best_savings = 0
+    best_depth = 0
+
+    for depth in range(max_depth):
+        # Remove (t1,t2) and (t3,t4), add (t2,t3), and close with (t4,t1)
+        g = g - C.cost(t2, t3) + C.cost(t3, t4)
+        tour.flip(t1, t2, t4, t3)
+        flips.append((t1, t2, t3, t4))
+        added.add((min(t2, t3), max(t2, t3)))
+        closed_savings = g - C.cost(t4, t1)
+        if closed_savings > best_savings + zero:
+            best_savings = closed_savings
+            best_depth = len(flips)
+        # Continue from the new open end t4, with the best next choice
+        t2 = t4
+        choices = LKChoices(C, tour, t1, t2, g, neighbors, neighbor_costs, added)
+        if not choices:
+            break
+        (next_gain, t3, t4) = choices[0]
+
+    # Roll back the flips made after the best closed cycle
+    while len(flips) > best_depth:
+        (t1, t2, t3, t4) = flips.pop()
+        tour.flip(t1, t4, t2, t3)
+
+    if best_depth > 0:
+        exchange['savings'] = best_savings
+        nodes = set()
+        for (t1, t2, t3, t4) in flips:
+            nodes.update((t1, t2, t3, t4))
+        exchange['nodes'] = list(nodes)
+    return(exchange)
@@ -0,0 +1,161 @@
+# Python Code for Parallel Multi-Start TSP Heuristics
+#
+#
+#  MultiStartCycle
+#
+#  a function which, given a complete graph (directed or undirected) in the
+#  networkx format, runs every combination of start node, construction
+#  heuristic and improvement heuristic in a pool of worker processes, and
+#  returns the best cycle found with statistics for every run, as a
+#  dictionary:
+#
+#   {'cycle':best cycle, 'cost':best cost, 'unique':number of distinct
+#    cycles, 'runs':[{'start':node, 'construction':name,
+#    'improvement':name, 'cost':cost, 'seconds':run time,
+#    'duplicate_of':earlier run position or None}, ...]}
+#
+#  Inputs:
+#
+#   G               - network in networkx format, or a CostMatrix
+#   start_nodes     - optional list of start nodes; default all nodes
+#   construction_names - optional list of construction names, from the
+#                     keys of the constructions dictionary below
+#   improvement_names - optional list of improvement names, from the keys
+#                     of the improvements dictionary below; None means the
+#                     constructed cycle is kept as is
+#   processes       - optional number of worker processes; default one
+#                     per core
+#
+#  The cost matrix is handed to each worker process once, when the pool
+#  starts (inherited for free where processes are forked), and never with
+#  the individual runs.  Identical cycles, in either direction or from any
+#  first node, are reported as duplicates of the first run that found them
+#
+#  cycles will be in node list format: [first, ..., last, first]
+#
+
+# Module imports
+import os
+import sys
+import time
+import multiprocessing
+import cost_matrix as cm
+import nearest_neighbor_simple as nns
+import nearest_insertion_simple as nis
+import farthest_insertion_simple as fis
+import cheapest_insertion_simple as cis
+import two_opt as to
+import or_opt as oo
+import lin_kernighan as lk
+
+# Construction heuristics by name, as functions of (C, start node); the
+# insertion heuristics start from the one node cycle [start, start]
+constructions = {
+    'nearest_neighbor': nns.NearNeighCycle,
+    'nearest_insertion': lambda C, s: nis.NearInsertionCycle(C, [s, s]),
+    'farthest_insertion': lambda C, s: fis.FarInsertionCycle(C, [s, s]),
+    'cheapest_insertion': lambda C, s: cis.CheapInsertionCycle(C, [s, s])
+}
+
+# Improvement heuristics by name, as functions of (C, cycle)
+improvements = {
+    None: lambda C, cycle: cycle,
+    'two_opt': to.TwoOptNeighborCycle,
+    'or_opt': oo.TwoOrOptCycle,
+    'lin_kernighan': lk.LinKernighanCycle
+}
+
+# The cost matrix used by the runs in this process
+worker_costs = None
+
+def MultiStartCycle(G, start_nodes=None, construction_names=None, improvement_names=None, processes=None):
+    global worker_costs
+
+    # Convert the graph to a cost matrix once, for all runs
+    C = cm.AsCostMatrix(G)
+    if start_nodes == None:
+        start_nodes = C.nodes
+    if construction_names == None:
+        construction_names = ['nearest_neighbor']
+    if improvement_names == None:
+        improvement_names = ['two_opt']
+    for name in construction_names:
+        if name not in constructions:
+            raise RuntimeError('Unknown construction heuristic %s; choose from %s' % (str(name),str(sorted(constructions.keys()))))
+    for name in improvement_names:
+        if name not in improvements:
+            raise RuntimeError('Unknown improvement heuristic %s; choose from %s' % (str(name),str(sorted(improvements.keys(), key=str))))
+
+    # One task per combination, referring to the start node by index
+    tasks = []
+    for s in start_nodes:
+        for construction in construction_names:
+            for improvement in improvement_names:
+                tasks.append((C.index[s], construction, improvement))
+
+    # Forked workers inherit the cost matrix from this process; otherwise
+    # it is sent once to each worker as the pool starts
+    get_start_method = getattr(multiprocessing, 'get_start_method', lambda: 'fork')
+    if get_start_method() == 'fork':
+        worker_costs = C
+        pool = multiprocessing.Pool(processes, InitWorker, (None,))
+    else:
+        pool = multiprocessing.Pool(processes, InitWorker, (C,))
+    try:
+        # Hand out several runs at a time to keep all workers busy
+        chunksize = max(1, len(tasks) // (4*(processes or multiprocessing.cpu_count())))
+        results = pool.map(RunTask, tasks, chunksize)
+    finally:
+        pool.close()
+        pool.join()
+        worker_costs = None
+
+    # Collect the statistics, flagging repeated cycles
+    runs = []
+    seen = {}
+    best = None
+    for ((s, construction, improvement), (key, cost, seconds)) in zip(tasks, results):
+        run = {'start':C.nodes[s], 'construction':construction, 'improvement':improvement, 'cost':cost, 'seconds':seconds, 'duplicate_of':seen.get(key)}
+        if key not in seen:
+            seen[key] = len(runs)
+        if best == None or cost < runs[best]['cost']:
+            best = len(runs)
+        runs.append(run)
+
+    # Rebuild the best cycle from its key, using the original node names
+    best_key = results[best][0]
+    best_cycle = C.to_nodes(list(best_key) + [best_key[0]])
+
+    print('Best of %d runs (%d distinct cycles), with cost:%s' % (len(runs),len(seen),str(runs[best]['cost'])))
+
+    return({'cycle':best_cycle, 'cost':runs[best]['cost'], 'unique':len(seen), 'runs':runs})
+
+# Set up a worker process: silence the heuristics' printing, and keep the
+# cost matrix if it was sent
+def InitWorker(C):
+    global worker_costs
+    sys.stdout = open(os.devnull, 'w')
+    if C != None:
+        worker_costs = C
+
+# Perform one run in a worker, returning the cycle's key, cost and run time
+def RunTask(task):
+    (s, construction, improvement) = task
+    C = worker_costs
+    start_time = time.time()
+    cycle = constructions[construction](C, C.nodes[s])
+    cycle = improvements[improvement](C, cycle)
+    seconds = time.time() - start_time
+    idx_cycle = C.to_indices(cycle)
+    return(CycleKey(idx_cycle), C.cycle_cost(idx_cycle), seconds)
+
+# A key that is the same for a cycle of indices from any first node, in
+# either direction: start at the smallest index, and go toward the smaller
+# of its two neighbors
+def CycleKey(idx_cycle):
+    tour = idx_cycle[:-1]
+    p = tour.index(min(tour))
+    tour = tour[p:] + tour[:p]
+    if len(tour) > 2 and tour[-1] < tour[1]:
+        tour = tour[:1] + tour[:0:-1]
+    return(tuple(tour))
@@ -6,68 +6,88 @@
 #  a function which, given a complete graph (directed or undirected) in the
 #  networkx format, returns a cycle using the nearest insertion heuristic
 #
+#  The costs from uninserted nodes to the cycle, and the cycle in cycle
+#  order with its arc costs, are kept as NumPy arrays, so that choosing
+#  the next node and its cheapest insertion arc are each a single
+#  vectorized operation
+#
 #  cycles will be in node list format: [first, ..., last, first]
 #
+#  G may also be a CostMatrix (see cost_matrix.py); a networkx graph is
+#  converted to one once up front
+#
 
 # Module imports
 import networkx as nx
-import find_insertion as fi
+import numpy as np
+import cost_matrix as cm
 
 def NearInsertionCycle(G, init_cycle=None):
     
+    # Convert the graph to a cost matrix once, and work with node indices
+    C = cm.AsCostMatrix(G)
+    n = len(C)
+    
     # If initial cycle is empty, find mincost edge
     if init_cycle == None:
-        # Grab all of the edge costs into dictionary d
-        d = nx.get_edge_attributes(G, 'cost')
-        # A python trick to find the key with minimum value in a dictionary
-        # min function returns an element (key) from d, but the one with minimum value (d.get)
-        mincost_edge = min(d, key=d.get)
-        cycle = [mincost_edge[0], mincost_edge[1], mincost_edge[0]]
+        (i, j) = C.extreme_arc()
+        cycle = [i, j, i]
     else:
-        cycle = init_cycle[:]
+        cycle = C.to_indices(init_cycle)
         
     # Initial cost
-    cycle_cost = 0
-    i = cycle[0]
-    for j in cycle[1:]:
-        cycle_cost += G[i][j]['cost']     
-        i = j
+    cycle_cost = C.cycle_cost(cycle)
     
-    # Create a list of uninserted nodes, and their costs to the cycle
-    uninserted_nodes = [node for node in G.nodes() if node not in cycle]
-    if not uninserted_nodes:
-        return(cycle)
+    # Create an array of uninserted nodes
+    uninserted = np.ones(n, dtype=bool)
+    uninserted[cycle] = False
+    remaining = int(uninserted.sum())
+    if not remaining:
+        return(C.to_nodes(cycle))
 
-    # Find the cheapest costs from uninserted nodes to cycle nodes
-    # and build a dictionary
-    # Initial values are the cost from the first node in the cycle
-    uninserted_node_costs = dict( (node, G[node][cycle[0]]['cost']) for node in uninserted_nodes)
-    # The keys in this dictionary are all of the uninserted nodes...
-    for i in uninserted_node_costs.keys():
-        for j in cycle[1:]:
-            if G[i][j]['cost'] < uninserted_node_costs[i]:
-                uninserted_node_costs[i] = G[i][j]['cost']
+    # Find the cheapest costs from uninserted nodes to cycle nodes as an
+    # array over all nodes; inserted nodes hold np.inf so they are never chosen
+    nodes = np.flatnonzero(uninserted)
+    node_costs = np.full(n, np.inf)
+    node_costs[nodes] = C.costs(nodes[:, np.newaxis], np.array(cycle[1:])[np.newaxis, :]).min(axis=1)
+    
+    # Store the cycle as an array of nodes in cycle order, with the first
+    # m+1 entries in use, and the costs of its arcs in the same order
+    order = np.empty(n+1, dtype=np.int64)
+    arc_costs = np.empty(n)
+    m = len(cycle) - 1
+    order[:m+1] = cycle
+    arc_costs[:m] = C.costs(order[:m], order[1:m+1])
         
     # Perform the primary nearest insertion search until all nodes inserted
-    while uninserted_node_costs.keys():
+    while remaining:
         # Node j to be inserted is closest to the current cycle
-        j = min(uninserted_node_costs, key=uninserted_node_costs.get)
-        # Insert j
-        best_insertion = fi.FindInsertionLocation(G, cycle, j)
-        # Extract predecessor i from the best_insertion dictionary
-        i = best_insertion['pred']
-        # Use the slice to insert j
-        cycle = cycle[:cycle.index(i)+1] + [j] + cycle[cycle.index(i)+1:]
-        # index(i) gives the position of i in the cycle, measured from 0
-        # list(index:count) is slice notation
-        cycle_cost += best_insertion['cost']
-        # Remove j from uninserted_node_costs
-        del(uninserted_node_costs[j])
+        j = int(np.argmin(node_costs))
+        # Insert j on the arc with the cheapest insertion cost
+        delta = C.costs(order[:m], j) + C.costs(j, order[1:m+1]) - arc_costs[:m]
+        # Ties go to the last arc in cycle order, as in FindInsertionLocation
+        e = m - 1 - int(np.argmin(delta[::-1]))
+        cycle_cost += float(delta[e])
+        # Arc e=(i,k) becomes arcs (i,j) and (j,k), shifting the rest along
+        (i, k) = (order[e], order[e+1])
+        order[e+2:m+2] = order[e+1:m+1]
+        order[e+1] = j
+        arc_costs[e+2:m+1] = arc_costs[e+1:m]
+        arc_costs[e] = C.cost(i, j)
+        arc_costs[e+1] = C.cost(j, k)
+        m += 1
+        # Mark j as inserted so it is never closest again
+        node_costs[j] = np.inf
+        uninserted[j] = False
+        remaining -= 1
         # Update how close all nodes are to the new cycle by
         # checking whether cost to j is less than cost to current cycle
-        for i in uninserted_node_costs.keys():
-            uninserted_node_costs[i] = min(uninserted_node_costs[i], G[i][j]['cost'])
+        nodes = np.flatnonzero(uninserted)
+        node_costs[nodes] = np.minimum(node_costs[nodes], C.costs(nodes, j))
         
+    # The cycle, using the original node names
+    cycle = C.to_nodes(order[:m+1].tolist())
+    
     print('Cycle: %s, with cost:%s' % (str(cycle),str(cycle_cost)))
        
     return(cycle)
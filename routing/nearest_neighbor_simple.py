@@ -7,50 +7,96 @@
 #  networkx format and a start node, returns a cycle using the
 #  nearest neighbor heuristic
 #
-#  
+#  G may also be a CostMatrix (see cost_matrix.py); a networkx graph is
+#  converted to one once up front
+#
+#  NearNeighPosCycle
+#
+#  the same heuristic for Euclidean instances, which uses the 'pos' node
+#  attribute instead of arc costs: a spatial_index.KDTreeIndex finds each
+#  nearest unreached node, so the graph needs no arcs at all and a cycle
+#  through n nodes takes roughly O(n log n) time.  G may also be a
+#  CostMatrix built from coordinates, or a dictionary {node:(x,y)}
 #
 
 # Module imports
 import networkx as nx
+import numpy as np
+import cost_matrix as cm
+import spatial_index as si
 
 def NearNeighCycle(G, start_node):
 
+    # Convert the graph to a cost matrix once, and work with node indices
+    C = cm.AsCostMatrix(G)
+    start = C.index[start_node]
+
     # Initialize the path at the start node    
-    nn_path = [start_node]
+    nn_path = [start]
     path_cost = 0
     
-    # Create a copy of the node list
-    unreached_nodes = G.nodes()
-    unreached_nodes.remove(start_node)
-    
-    # Grab the largest arc cost in the network
-    maxcost = max(nx.get_edge_attributes(G, 'cost').values())
+    # Mark every node but the start as unreached
+    unreached = np.ones(len(C), dtype=bool)
+    unreached[start] = False
     
     # Prepare for search
-    end_node = start_node
+    end_node = start
+    closest = start
     
     # Perform the primary nearest neighbor search until all nodes reached
-    while unreached_nodes:
-        cost = maxcost
-        # Find nearest node j to end_node
-        for j in unreached_nodes:
-            if G[end_node][j]['cost'] <= cost:
-                cost = G[end_node][j]['cost']
-                closest = j
+    for step in range(len(C)-1):
+        # Find nearest node j to end_node; reached nodes are masked out.
+        # Ties go to the last node in graph order, as in the original loop
+        row = np.where(unreached, C.row(end_node), np.inf)
+        closest = len(row) - 1 - int(np.argmin(row[::-1]))
+        cost = float(row[closest])
         # Add the closest to the path, and the incremental cost
-        nn_path = nn_path + [closest]
+        nn_path.append(closest)
         path_cost += cost
         end_node = closest
         # Update the unreached nodes
-        unreached_nodes.remove(closest)
+        unreached[closest] = False
     
     # Finally, reach back to the starting node
-    nn_path = nn_path + [start_node]
-    path_cost += G[closest][start_node]['cost']
+    nn_path.append(start)
+    path_cost += C.cost(closest, start)
+    
+    # Rename the path nn_cycle for clarity, using the original node names
+    nn_cycle = C.to_nodes(nn_path)
+    
+    print('Cycle: %s, with cost:%s' % (str(nn_cycle),str(path_cost)))
+    
+    return(nn_cycle)
+
+def NearNeighPosCycle(G, start_node):
+    
+    # Grab the coordinates, and index all nodes but the start
+    (nodes, XY) = si.GetCoords(G)
+    start = nodes.index(start_node)
+    grid = si.KDTreeIndex(XY)
+    grid.remove(start)
+    
+    # Initialize the path at the start node    
+    nn_path = [start]
+    
+    # Perform the primary nearest neighbor search until all nodes reached
+    end_node = start
+    while len(grid):
+        closest = grid.nearest(XY[end_node, 0], XY[end_node, 1])
+        nn_path.append(closest)
+        grid.remove(closest)
+        end_node = closest
+    
+    # Finally, reach back to the starting node
+    nn_path.append(start)
+    
+    # Euclidean cost of the cycle
+    path = XY[nn_path]
+    path_cost = float(np.sqrt(((path[1:] - path[:-1])**2).sum(axis=1)).sum())
+    
+    # Rename the path nn_cycle for clarity, using the original node names
+    nn_cycle = [nodes[a] for a in nn_path]
     
-    print('Cycle: %s, with cost:%s' % (str(nn_path),str(path_cost)))
-       
-    # Rename the path nn_cycle for clarity
-    nn_cycle = nn_path
+    print('Cycle through %d nodes, with cost:%s' % (len(nn_cycle)-1,str(path_cost)))
     
     return(nn_cycle)
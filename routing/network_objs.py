@@ -7,12 +7,36 @@
 #  This format allows support for multi digraphs where more than one
 #  network arc may connect any two pair of nodes.
 #
+#  PathsFromEdgeIDs
+#
+#  a function which builds many Paths at once from a matrix of edge IDs,
+#  without validating each one
+#
 #  NodePath
 #
 #  a directed path class, where paths are sequences of nodes
 #  This format is especially useful when the underlying network is
 #  undirected
 #
+#  LinkedNodePath
+#
+#  a NodePath stored as successor and predecessor maps, so that pred, succ,
+#  insert and the test (node in path) take constant time.  Nodes may not
+#  repeat
+#
+#  ArcIndex
+#
+#  a table which interns node names and edges as integer IDs, shared by
+#  many compact paths
+#
+#  CompactPath, CompactNodePath
+#
+#  memory-light versions of Path and NodePath for large path sets, with
+#  __slots__ instead of an instance dictionary, edges or nodes stored as
+#  integer IDs from an ArcIndex in an array('i'), and the cost and name
+#  as typed fields instead of an attribute dictionary.  Each converts to
+#  and from its full counterpart
+#
 #  NodeCycle
 #
 #  a closed NodePath
@@ -21,14 +45,18 @@
 #
 #
 
+# Module imports
+from array import array
+
 class Path(object):
     """ A class for storing a directed path as an edge list """
     # How the Path object represents itself to others
     def __repr__(self):
         return('Path(%s)' % (str(self.edges)))
 
-    # Construct with a list of edges in the path, and an attributes dictionary
-    def __init__(self, edges=None, attr=None):    
+    # Construct with a list of edges in the path, and an attributes dictionary.
+    # Trusted callers may skip validation with validate=False
+    def __init__(self, edges=None, attr=None, validate=True):
         if edges == None:
             self.edges = []
         else:
@@ -40,24 +68,31 @@ class Path(object):
             self.attr = {}
         else:
             self.attr = attr
+        # Hashed set of the (tail,head) edge tuples, for the test: if edge in Path
+        self.edge_set = set(self.edges)
         # If initialized with edges, ensure that we have a path
         if edges:
-            self.validate()
+            if validate:
+                self.validate()
             # Set the origin and destination
             self.origin = self.edges[0][0]
             self.dest = self.edges[-1][1]
     
-    # Validator looks for errors in the structure of the path                    
-    def validate(self):
+    # Validator looks for errors in the structure of the path, checking
+    # the junctions from edge position start onward.  A list of edges may
+    # be checked in place of the path's own
+    def validate(self, start=0, edges=None):
+        if edges == None:
+            edges = self.edges
         try:
             # Validate that the edge set forms a directed path
-            last_head = self.edges[0][1]
-            for e in self.edges[1:]:
+            last_head = edges[start][1]
+            for e in edges[start+1:]:
                 tail = e[0]
                 if last_head != tail:
-                    raise RuntimeError('Path with invalid edge set: ' + str(self.edges))
+                    raise RuntimeError('Path with invalid edge set: ' + str(edges))
                 last_head = e[1]
-        except:
+        except (TypeError, IndexError):
             raise RuntimeError('Error in path: all edges must have (tail,head) nodes.')
     
     # Implement methods to allow Path to act like a list of edges            
@@ -72,11 +107,9 @@ class Path(object):
     def __setitem__(self, attr_key, value):
         self.attr[attr_key] = value
     
-    # Implements the test: if edge in Path    
+    # Implements the test: if edge in Path, using the edge set
     def __contains__(self, edge):
-        if edge in self.edges:
-            return(True)
-        return(False)
+        return(edge in self.edge_set)
         
     # Implements the + operation to add an edge to path
     def __add__(self, edge):
@@ -84,23 +117,47 @@ class Path(object):
         if not isinstance(edge, list):
             edge = [edge]
         # Path + edge will modify the original path
-        path.extend(edge)
+        self.extend(edge)
     
-    # Extend the path with additional edges, and delta_cost                    
-    def extend(self, new_edges, delta_cost=0):
+    # Extend the path with additional edges, and delta_cost.  Only the
+    # junctions from the old last edge onward are checked, unless validate
+    # is False
+    def extend(self, new_edges, delta_cost=0, validate=True):
         # If edges not yet a list, turn them into a list
         if not isinstance(new_edges, list):
             new_edges = [new_edges]
+        # Validate the junction with the old last edge and the new edges,
+        # before any of them are added
+        if validate:
+            self.validate(0, self.edges[-1:] + new_edges)
         # Add the new edges
         self.edges += new_edges
-        # Validate
-        self.validate()
+        self.edge_set.update(new_edges)
         # Reset origin, destination, cost
         self.origin = self.edges[0][0]
         self.dest = self.edges[-1][1]
         if 'cost' in self.attr:
             self.attr['cost'] += delta_cost
 
+# Build many paths at once from a matrix of edge IDs: row r of E lists the
+# positions in edges of the edges of path r, padded at the end with -1 for
+# shorter paths.  attrs, if given, holds one attribute dictionary per row.
+# Rows are trusted to form paths unless validate is True
+def PathsFromEdgeIDs(edges, E, attrs=None, validate=False):
+    paths = []
+    for (r, row) in enumerate(E):
+        path_edges = []
+        for a in row:
+            if a < 0:
+                break
+            path_edges.append(edges[a])
+        if attrs == None:
+            attr = {}
+        else:
+            attr = attrs[r]
+        paths.append(Path(path_edges, attr, validate))
+    return(paths)
+
 class NodePath(object):
     """ A class for storing a directed path as a node list """
     # How the Path object represents itself to others
@@ -225,3 +282,377 @@ class NodePath(object):
                 
         
        
+
+class LinkedNodePath(NodePath):
+    """ A class for storing a directed path as linked successor and predecessor maps """
+    # How the LinkedNodePath object represents itself to others
+    def __repr__(self):
+        return('LinkedNodePath(%s)' % (str(self.nodes)))
+
+    # Construct as for NodePath; setting nodes builds the maps
+    def __init__(self, nodes=None, attr=None):
+        self.succ_map = {}
+        self.pred_map = {}
+        self.attr = {}
+        NodePath.__init__(self, nodes, attr)
+
+    # The node list, built by walking the successor map from the origin
+    @property
+    def nodes(self):
+        nodes = []
+        if self.succ_map:
+            node = self.origin
+            while True:
+                nodes.append(node)
+                if node == self.dest:
+                    break
+                node = self.succ_map[node]
+        return(nodes)
+
+    # Replace the node list, rebuilding the maps
+    @nodes.setter
+    def nodes(self, nodes):
+        self.succ_map = {}
+        self.pred_map = {}
+        self.extend(list(nodes))
+
+    # Implements the len() function to take LinkedNodePath object
+    def __len__(self):
+        # Return the node count in the path
+        return(len(self.succ_map))
+
+    # Implements the test: if node in LinkedNodePath
+    def __contains__(self, node):
+        return(node in self.succ_map)
+
+    # Return a node's predecessor on path
+    def pred(self, node):
+        if node not in self.succ_map:
+            raise RuntimeError('Node %s not in path: %s' % (str(node),str(self.nodes)) )
+        # First node in the path has no predecessor
+        if node == self.origin:
+            return(node)
+        return(self.pred_map[node])
+
+    # Return a node's successor on path
+    def succ(self, node):
+        if node not in self.succ_map:
+            raise RuntimeError('Node %s not in path: %s' % (str(node),str(self.nodes)) )
+        # Last node in the path has no successor
+        if node == self.dest:
+            return(node)
+        return(self.succ_map[node])
+
+    # Extend the path with additional nodes, and delta_cost
+    def extend(self, new_nodes, delta_cost=0):
+        # If user does not pass a list, make it a list
+        if not isinstance(new_nodes, list):
+            new_nodes = [new_nodes]
+        # Check every new node before any of them are linked in
+        seen = set()
+        for node in new_nodes:
+            if node in self.succ_map or node in seen:
+                raise RuntimeError('Node %s already in path: nodes may not repeat.' % str(node))
+            seen.add(node)
+        for node in new_nodes:
+            if self.succ_map:
+                self.succ_map[self.dest] = node
+                self.pred_map[node] = self.dest
+            else:
+                self.origin = node
+            # The last node's successor is None until the path is extended
+            self.succ_map[node] = None
+            self.dest = node
+        if 'cost' in self.attr:
+            self.attr['cost'] += delta_cost
+
+    # Insert a node into a path, at delta_cost
+    def insert(self, succ, node, delta_cost=0):
+        # Insert node immediately before succ(essor)
+        if succ not in self.succ_map:
+            raise RuntimeError('Error in path insertion before %s: node %s not in path.' % (str(succ),str(succ)) )
+        if node in self.succ_map:
+            raise RuntimeError('Node %s already in path: nodes may not repeat.' % str(node))
+        if succ == self.origin:
+            self.origin = node
+        else:
+            pred = self.pred_map[succ]
+            self.succ_map[pred] = node
+            self.pred_map[node] = pred
+        self.succ_map[node] = succ
+        self.pred_map[succ] = node
+        if 'cost' in self.attr:
+            self.attr['cost'] += delta_cost
+
+    # Compute the change in path cost from inserting node before succ,
+    # with respect to a graph G in the networkx format
+    def insert_cost(self, G, succ, node):
+        try:
+            delta_cost = G[node][succ]['cost']
+            if succ != self.origin:
+                pred = self.pred_map[succ]
+                delta_cost += G[pred][node]['cost'] - G[pred][succ]['cost']
+        except KeyError:
+            raise RuntimeError('Insertion of %s before %s uses an arc that does not exist, or has no cost.' % (str(node),str(succ)))
+        return(delta_cost)
+
+class ArcIndex(object):
+    """ A class for interning nodes and edges as integer IDs """
+    # How the ArcIndex object represents itself to others
+    def __repr__(self):
+        return('ArcIndex(%d nodes, %d arcs)' % (len(self.nodes), len(self.arcs)))
+
+    # Construct empty, or with an initial list of edges
+    def __init__(self, edges=None):
+        self.nodes = []
+        self.node_ids = {}
+        self.arcs = []
+        self.arc_ids = {}
+        # Tail and head node IDs of each arc ID
+        self.tails = array('i')
+        self.heads = array('i')
+        if edges != None:
+            for e in edges:
+                self.arc_id(e)
+
+    # Implements the len() function to give the arc count
+    def __len__(self):
+        return(len(self.arcs))
+
+    # Implements the test: if edge in ArcIndex
+    def __contains__(self, edge):
+        return(edge in self.arc_ids)
+
+    # Return the ID of a node, interning it if new
+    def node_id(self, node):
+        n = self.node_ids.get(node)
+        if n == None:
+            n = len(self.nodes)
+            self.node_ids[node] = n
+            self.nodes.append(node)
+        return(n)
+
+    # Return the ID of an edge (tail, head) or (tail, head, key), interning
+    # it if new
+    def arc_id(self, edge):
+        a = self.arc_ids.get(edge)
+        if a == None:
+            try:
+                tail = self.node_id(edge[0])
+                head = self.node_id(edge[1])
+            except (TypeError, IndexError):
+                raise RuntimeError('Error in path: all edges must have (tail,head) nodes.')
+            a = len(self.arcs)
+            self.arc_ids[edge] = a
+            self.arcs.append(edge)
+            self.tails.append(tail)
+            self.heads.append(head)
+        return(a)
+
+class CompactPath(object):
+    """ A class for storing a directed path as an array of arc IDs """
+    __slots__ = ('index', 'arcs', 'path_cost', 'name')
+
+    # How the CompactPath object represents itself to others
+    def __repr__(self):
+        return('CompactPath(%s)' % (str(self.edges)))
+
+    # Construct with an ArcIndex, a list of edges in the path, and the path
+    # cost and name
+    def __init__(self, index, edges=None, cost=0.0, name=None):
+        self.index = index
+        self.arcs = array('i')
+        self.path_cost = float(cost)
+        self.name = name
+        if edges:
+            self.extend(edges)
+
+    # The edges of the path, as stored in the ArcIndex
+    @property
+    def edges(self):
+        return([self.index.arcs[a] for a in self.arcs])
+
+    # Origin and destination, looked up from the first and last arcs
+    @property
+    def origin(self):
+        return(self.index.nodes[self.index.tails[self.arcs[0]]])
+
+    @property
+    def dest(self):
+        return(self.index.nodes[self.index.heads[self.arcs[-1]]])
+
+    # Implements the len() function to take CompactPath object
+    def __len__(self):
+        return(len(self.arcs))
+
+    # Supports the Path[attr_key] model for the typed fields 'cost' and 'name'
+    def __getitem__(self, attr_key):
+        if attr_key == 'cost':
+            return(self.path_cost)
+        if attr_key == 'name':
+            return(self.name)
+        raise KeyError(attr_key)
+
+    def __setitem__(self, attr_key, value):
+        if attr_key == 'cost':
+            self.path_cost = float(value)
+        elif attr_key == 'name':
+            self.name = value
+        else:
+            raise KeyError(attr_key)
+
+    # Implements the test: if edge in CompactPath
+    def __contains__(self, edge):
+        a = self.index.arc_ids.get(edge)
+        return(a != None and a in self.arcs)
+
+    # Extend the path with additional edges, and delta_cost
+    def extend(self, new_edges, delta_cost=0):
+        # If edges not yet a list, turn them into a list
+        if not isinstance(new_edges, list):
+            new_edges = [new_edges]
+        new_arcs = array('i', [self.index.arc_id(e) for e in new_edges])
+        # Validate that the new arcs continue the path
+        tails = self.index.tails
+        heads = self.index.heads
+        last = self.arcs[-1] if self.arcs else None
+        for a in new_arcs:
+            if last != None and heads[last] != tails[a]:
+                raise RuntimeError('Path with invalid edge set: ' + str(self.edges + new_edges))
+            last = a
+        self.arcs.extend(new_arcs)
+        self.path_cost += delta_cost
+
+    # Convert to a Path (or another class taking (edges, attr))
+    def to_path(self, path_class=Path):
+        attr = {'cost':self.path_cost}
+        if self.name != None:
+            attr['name'] = self.name
+        return(path_class(self.edges, attr))
+
+class CompactNodePath(object):
+    """ A class for storing a directed path as an array of node IDs """
+    __slots__ = ('index', 'node_ids', 'path_cost', 'name')
+
+    # How the CompactNodePath object represents itself to others
+    def __repr__(self):
+        return('CompactNodePath(%s)' % (str(self.nodes)))
+
+    # Construct with an ArcIndex (for its node IDs), a sequence of nodes in
+    # the path, and the path cost and name
+    def __init__(self, index, nodes=None, cost=0.0, name=None):
+        self.index = index
+        self.node_ids = array('i')
+        self.path_cost = float(cost)
+        self.name = name
+        if nodes:
+            self.extend(nodes)
+
+    # The nodes of the path
+    @property
+    def nodes(self):
+        return([self.index.nodes[n] for n in self.node_ids])
+
+    @property
+    def origin(self):
+        return(self.index.nodes[self.node_ids[0]])
+
+    @property
+    def dest(self):
+        return(self.index.nodes[self.node_ids[-1]])
+
+    # Implements the len() function to take CompactNodePath object
+    def __len__(self):
+        return(len(self.node_ids))
+
+    # Supports the NodePath[attr_key] model for the typed fields 'cost' and
+    # 'name'
+    def __getitem__(self, attr_key):
+        if attr_key == 'cost':
+            return(self.path_cost)
+        if attr_key == 'name':
+            return(self.name)
+        raise KeyError(attr_key)
+
+    def __setitem__(self, attr_key, value):
+        if attr_key == 'cost':
+            self.path_cost = float(value)
+        elif attr_key == 'name':
+            self.name = value
+        else:
+            raise KeyError(attr_key)
+
+    # Implements the test: if node in CompactNodePath
+    def __contains__(self, node):
+        n = self.index.node_ids.get(node)
+        return(n != None and n in self.node_ids)
+
+    # Return a node's predecessor on path
+    # Note: if nodes repeat, only the first predecessor returned
+    def pred(self, node):
+        if node not in self:
+            raise RuntimeError('Node %s not in path: %s' % (str(node),str(self.nodes)) )
+        node_idx = self.node_ids.index(self.index.node_ids[node])
+        # First node in the path has no predecessor
+        if node_idx == 0:
+            return(node)
+        return(self.index.nodes[self.node_ids[node_idx-1]])
+
+    # Return a node's successor on path
+    # Note: if nodes repeat, only the first successor returned
+    def succ(self, node):
+        if node not in self:
+            raise RuntimeError('Node %s not in path: %s' % (str(node),str(self.nodes)) )
+        node_idx = self.node_ids.index(self.index.node_ids[node])
+        # Last node in the path has no successor
+        if node_idx == len(self)-1:
+            return(node)
+        return(self.index.nodes[self.node_ids[node_idx+1]])
+
+    # Extend the path with additional nodes, and delta_cost
+    def extend(self, new_nodes, delta_cost=0):
+        # If user does not pass a list, make it a list
+        if not isinstance(new_nodes, list):
+            new_nodes = [new_nodes]
+        self.node_ids.extend(array('i', [self.index.node_id(node) for node in new_nodes]))
+        self.path_cost += delta_cost
+
+    # Insert a node into a path, at delta_cost
+    def insert(self, succ, node, delta_cost=0):
+        # Insert node immediately before succ(essor)
+        if succ not in self:
+            raise RuntimeError('Error in path insertion before %s: node %s not in path.' % (str(succ),str(succ)) )
+        succ_idx = self.node_ids.index(self.index.node_ids[succ])
+        self.node_ids.insert(succ_idx, self.index.node_id(node))
+        self.path_cost += delta_cost
+
+    # Compute cost of path, with respect to a graph G in the networkx format
+    def cost(self, G):
+        nodes = self.nodes
+        cost = 0
+        # Loop over all arcs in the path
+        for (i, j) in zip(nodes[:-1], nodes[1:]):
+            try:
+                cost += G[i][j]['cost']
+            except KeyError:
+                raise RuntimeError('Arc (%s,%s) does not exist, or has no cost.' % (str(i),str(j)))
+        # Set the cost field
+        self.path_cost = float(cost)
+        return(cost)
+
+    # Convert to a NodePath (or another class taking (nodes, attr))
+    def to_path(self, path_class=NodePath):
+        attr = {'cost':self.path_cost}
+        if self.name != None:
+            attr['name'] = self.name
+        return(path_class(self.nodes, attr))
+
+# Convert a Path (edges) or NodePath (nodes) to its compact counterpart,
+# interning its edges or nodes in index.  Attributes other than 'cost' and
+# 'name' are dropped
+def CompactPathFrom(index, path):
+    cost = path.attr.get('cost', 0.0)
+    name = path.attr.get('name')
+    if hasattr(path, 'edges'):
+        return(CompactPath(index, list(path.edges), cost, name))
+    return(CompactNodePath(index, list(path.nodes), cost, name))
@@ -0,0 +1,194 @@
+# Python Code for Or-Opt
+#
+#
+#  OrOptCycle
+#
+#  a function which, given a complete graph (directed or undirected) in the
+#  networkx format, and an initial cycle, returns a cycle improved by a series
+#  of Or-exchanges: a segment of 1 to 3 consecutive nodes is moved to another
+#  place in the cycle, in either orientation.  Only new arcs from a segment
+#  end to one of its k nearest neighbors are considered, and "don't-look
+#  bits" skip nodes whose cycle arcs have not changed
+#
+#  TwoOrOptCycle
+#
+#  the same search, which also tries the 2-exchanges of
+#  two_opt.TwoOptNeighborCycle at each node, in one descent loop
+#
+#  cycles will be in node list format: [first, ..., last, first]
+#
+#  G may also be a CostMatrix (see cost_matrix.py); a networkx graph is
+#  converted to one once up front.  Costs are assumed symmetric
+#
+
+# Module imports
+import time
+import numpy as np
+import cost_matrix as cm
+import tsp_tools as tt
+import two_opt as to
+
+# Zero tolerance
+zero = 0.000001
+
+# Longest segment moved
+max_segment = 3
+
+def OrOptCycle(G, init_cycle=None, k=10):
+    return(LocalSearchCycle(G, init_cycle, k, [OrOptNodeMove]))
+
+def TwoOrOptCycle(G, init_cycle=None, k=10):
+    return(LocalSearchCycle(G, init_cycle, k, [to.TwoOptNodeMove, OrOptNodeMove]))
+
+# Descend with the node move functions until no node finds an improving move.
+# Each move function takes (C, tour, a, neighbors, neighbor_costs), makes the
+# first improving move it finds at node a, and returns its savings and the
+# nodes whose cycle arcs changed.  The search stops early once time_limit
+# seconds pass, and if trajectory is a list, (seconds, cost) pairs are
+# appended to it at the start and after each improvement
+def LocalSearchCycle(G, init_cycle, k, node_moves, time_limit=None, trajectory=None):
+    
+    # Start the clock
+    start_time = time.time()
+
+    # Convert the graph to a cost matrix once, and work with node indices
+    C = cm.AsCostMatrix(G)
+
+    # If initial cycle is empty, use default node tour
+    if init_cycle == None:
+        init_cycle = C.nodes + [C.nodes[0]]
+
+    # Store the cycle as an ArrayTour, so that each move is made in place
+    tour = tt.ArrayTour(C.to_indices(init_cycle), len(C))
+    if len(tour) < len(C):
+        raise RuntimeError('Neighbor list local search requires a cycle visiting every node.')
+    if len(tour) < 5:
+        return(init_cycle[:])
+
+    # Neighbor lists, and their costs, for the candidate new arcs
+    neighbors = C.neighbors(k)
+    neighbor_costs = C.costs(np.arange(len(C))[:, np.newaxis], neighbors).tolist()
+    neighbors = neighbors.tolist()
+
+    # Compute initial cost
+    cycle_cost = tt.CycleCost(C, init_cycle)
+    if trajectory != None:
+        trajectory.append((time.time() - start_time, cycle_cost))
+
+    # All nodes start with their don't-look bits off, waiting in the queue
+    queue = list(reversed(tour.tour))
+    queued = [False]*len(C)
+    for a in queue:
+        queued[a] = True
+
+    # Search nodes until every don't-look bit is on
+    while queue:
+        if time_limit != None and time.time() - start_time > time_limit:
+            break
+        a = queue.pop()
+        queued[a] = False
+        improved = True
+        while improved:
+            improved = False
+            for node_move in node_moves:
+                exchange = node_move(C, tour, a, neighbors, neighbor_costs)
+                if exchange['savings'] > 0:
+                    cycle_cost = cycle_cost - exchange['savings']
+                    if trajectory != None:
+                        trajectory.append((time.time() - start_time, cycle_cost))
+                    # Turn off the don't-look bits of the end nodes
+                    for e in exchange['nodes']:
+                        if not queued[e]:
+                            queued[e] = True
+                            queue.append(e)
+                    improved = True
+                    break
+
+    # Return the cycle starting from the original first node
+    cycle = C.to_nodes(tour.cycle(C.index[init_cycle[0]]))
+
+    print('Cycle: %s, with cost:%s' % (str(cycle),str(cycle_cost)))
+
+    return(cycle)
+
+# Find and make the first improving Or-exchange that moves a segment with
+# end node index a, adding an arc from a to one of its neighbors.  Returns
+# the savings, and the end nodes of the changed arcs
+def OrOptNodeMove(C, tour, a, neighbors, neighbor_costs):
+
+    # Initial exchange finds no savings
+    exchange = {'savings':0}
+    n = len(tour)
+
+    # Walk the segment forward from a, then backward; in each direction,
+    # "ahead" moves along the segment away from a
+    for forward in (True, False):
+        if forward:
+            ahead = tour.next
+            behind = tour.prev
+        else:
+            ahead = tour.prev
+            behind = tour.next
+        # Segment [s1=a, ..., s2] sits between p and q
+        p = behind(a)
+        segment = [a]
+        for length in range(1, max_segment+1):
+            if length > 1:
+                segment.append(ahead(segment[-1]))
+            s2 = segment[-1]
+            q = ahead(s2)
+            if n < length + 3:
+                break
+            # Savings from closing the gap left by the segment
+            gap_savings = C.cost(p, a) + C.cost(s2, q) - C.cost(p, q)
+            for (x, ax_cost) in zip(neighbors[a], neighbor_costs[a]):
+                # New arc (a,x) must be cheaper than the gap savings
+                if ax_cost >= gap_savings:
+                    break
+                if x in segment:
+                    continue
+                # Either a follows x (c=x, d=ahead(x)), keeping the segment
+                # orientation, or x follows a (c=behind(x), d=x), reversing it
+                for keep in (True, False):
+                    if keep:
+                        c = x
+                        d = ahead(x)
+                        if d in segment:
+                            continue
+                        savings = gap_savings + C.cost(c, d) - ax_cost - C.cost(s2, d)
+                    else:
+                        c = behind(x)
+                        d = x
+                        if c in segment:
+                            continue
+                        savings = gap_savings + C.cost(c, d) - C.cost(c, s2) - ax_cost
+                    if c == q and d == p:
+                        continue
+                    if savings > zero:
+                        MoveSegment(tour, p, a, s2, q, c, d, keep)
+                        exchange['savings'] = savings
+                        exchange['nodes'] = [p, a, s2, q, c, d]
+                        return(exchange)
+
+    return(exchange)
+
+# Move the segment [s1, ..., s2] between p and q to between c and d, where
+# the cycle reads p, s1, ..., s2, q, ..., c, d in one orientation.  The
+# segment is reversed (c, s2, ..., s1, d) unless keep is True
+# (c, s1, ..., s2, d).  Each step is a 2-exchange, so the move works with
+# either orientation of the ArrayTour
+def MoveSegment(tour, p, s1, s2, q, c, d, keep):
+    if d == p:
+        # c, p, s1, ..., s2, q  becomes  c, s2, ..., s1, p, q
+        tour.flip(c, p, s2, q)
+    elif c == q:
+        # p, s1, ..., s2, q, d  becomes  p, q, s2, ..., s1, d
+        tour.flip(p, s1, q, d)
+    else:
+        # p, s1, ..., s2, q, ..., c, d  becomes  p, c, ..., q, s2, ..., s1, d
+        tour.flip(p, s1, c, d)
+        # and then  p, q, ..., c, s2, ..., s1, d
+        tour.flip(p, c, q, s2)
+    # Now c, s2, ..., s1, d; reverse the segment back to keep its orientation
+    if keep:
+        tour.flip(c, s2, s1, d)
@@ -11,6 +11,11 @@
 #
 #  Attribute 'cost' has a special designation
 #
+#  PathsFromEdgeIDs
+#
+#  a function which builds many Paths at once from a matrix of edge IDs,
+#  without validating each one
+#
 #
 
 class Path(object):
@@ -19,28 +24,40 @@ class Path(object):
     def __repr__(self):
         return('Path(%s)' % (str(self.edges)))
 
-    # Construct with a list of edges in the path, and an attributes dictionary
-    def __init__(self, edges=[], attr={}):
+    # Construct with a list of edges in the path, and an attributes dictionary.
+    # Trusted callers may skip validation with validate=False
+    def __init__(self, edges=None, attr=None, validate=True):
+        if edges == None:
+            edges = []
+        if attr == None:
+            attr = {}
         self.edges = edges
         self.attr = attr
+        # Hashed set of the (tail,head) edge tuples, for the test: if edge in Path
+        self.edge_set = set(self.edges)
         # If initialized with edges, ensure that we have a path
         if edges:
-            self.validate()
+            if validate:
+                self.validate()
             # Set the origin and destination
             self.origin = self.edges[0][0]
             self.dest = self.edges[-1][1]
     
-    # Validator looks for errors in the structure of the path                    
-    def validate(self):
+    # Validator looks for errors in the structure of the path, checking
+    # the junctions from edge position start onward.  A list of edges may
+    # be checked in place of the path's own
+    def validate(self, start=0, edges=None):
+        if edges == None:
+            edges = self.edges
         try:
             # Validate that the edge set forms a directed path
-            last_head = self.edges[0][1]
-            for e in self.edges[1:]:
+            last_head = edges[start][1]
+            for e in edges[start+1:]:
                 tail = e[0]
                 if last_head != tail:
-                    raise RuntimeError('Path with invalid edge set: ' + str(self.edges))
+                    raise RuntimeError('Path with invalid edge set: ' + str(edges))
                 last_head = e[1]
-        except:
+        except (TypeError, IndexError):
             raise RuntimeError('Error in path: all edges must have (tail,head) nodes.')
     
     # Implement methods to allow Path to act like a list of edges            
@@ -55,25 +72,47 @@ class Path(object):
     def __setitem__(self, attr_key, value):
         self.attr[attr_key] = value
     
-    # Implements the test: if edge in Path    
+    # Implements the test: if edge in Path, using the edge set
     def __contains__(self, edge):
-        if edge in self.edges:
-            return(True)
-        return(False)
+        return(edge in self.edge_set)
         
     # Implements the + operation to add an edge to path
     def __add__(self, edge):
         self.extend(edge)
     
-    # Extend the path with additional edges, and delta_cost                    
-    def extend(self, new_edges, delta_cost=0):
+    # Extend the path with additional edges, and delta_cost.  Only the
+    # junctions from the old last edge onward are checked, unless validate
+    # is False
+    def extend(self, new_edges, delta_cost=0, validate=True):
+        # Validate the junction with the old last edge and the new edges,
+        # before any of them are added
+        if validate:
+            self.validate(0, self.edges[-1:] + new_edges)
         # Add the new edges
         self.edges += new_edges
-        # Validate
-        self.validate()
+        self.edge_set.update(new_edges)
         # Reset origin, destination, cost
         self.origin = self.edges[0][0]
         self.dest = self.edges[-1][1]
         if 'cost' in self.attr:
             self.attr['cost'] += delta_cost
         
+
+# Build many paths at once from a matrix of edge IDs: row r of E lists the
+# positions in edges of the edges of path r, padded at the end with -1 for
+# shorter paths.  attrs, if given, holds one attribute dictionary per row.
+# Rows are trusted to form paths unless validate is True
+def PathsFromEdgeIDs(edges, E, attrs=None, validate=False):
+    paths = []
+    for (r, row) in enumerate(E):
+        path_edges = []
+        for a in row:
+            if a < 0:
+                break
+            path_edges.append(edges[a])
+        if attrs == None:
+            attr = {}
+        else:
+            attr = attrs[r]
+        paths.append(Path(path_edges, attr, validate))
+    return(paths)
@@ -0,0 +1,133 @@
+# Python Code for Space-Filling Curve Construction
+#
+#
+#  HilbertCycle
+#
+#  a function which, given a graph in the networkx format with a 'pos'
+#  attribute (x,y) for each node (or a dictionary {node:(x,y)}, or a
+#  CostMatrix built from coordinates), returns the cycle which visits the
+#  nodes in the order of the Hilbert curve through the bounding box of the
+#  coordinates.  Sorting by curve position takes O(n log n) time, and
+#  nearby nodes along the curve are nearby in the plane, so the cycle is a
+#  quick seed for the improvement heuristics at very large n
+#
+#  StreamHilbertCycle
+#
+#  the same construction over coordinates that arrive in chunks, each a
+#  list of (node, x, y) tuples, for example from ReadCoordChunks.  Only
+#  node names and curve positions are kept, so the bounding box must be
+#  given up front as (xmin, ymin, xmax, ymax)
+#
+#  ReadCoordChunks
+#
+#  a generator which reads "node,x,y" lines from a text file in chunks of
+#  chunk_size (node, x, y) tuples
+#
+#  cycles will be in node list format: [first, ..., last, first]
+#
+
+# Module imports
+import numpy as np
+import spatial_index as si
+
+# Bits of curve resolution per coordinate; the curve passes through a
+# 2^order by 2^order grid
+order = 16
+
+def HilbertCycle(G, start_node=None):
+
+    (nodes, XY) = si.GetCoords(G)
+    if len(nodes) == 0:
+        raise RuntimeError('Graph has no nodes.')
+    bbox = (XY[:, 0].min(), XY[:, 1].min(), XY[:, 0].max(), XY[:, 1].max())
+
+    # Visit the nodes in order of curve position
+    visit = np.argsort(HilbertKeys(XY, bbox), kind='mergesort')
+    cycle = StartCycle([nodes[a] for a in visit], start_node)
+
+    # Cost of the cycle, as the sum of Euclidean arc lengths
+    ordered = XY[visit]
+    steps = np.diff(np.vstack([ordered, ordered[:1]]), axis=0)
+    cycle_cost = float(np.sqrt((steps**2).sum(axis=1)).sum())
+
+    print('Cycle through %d nodes, with cost:%s' % (len(nodes),str(cycle_cost)))
+
+    return(cycle)
+
+def StreamHilbertCycle(chunks, bbox, start_node=None):
+
+    nodes = []
+    keys = []
+    for chunk in chunks:
+        if not len(chunk):
+            continue
+        nodes.extend([node for (node, x, y) in chunk])
+        XY = np.array([(x, y) for (node, x, y) in chunk], dtype=np.float64)
+        keys.append(HilbertKeys(XY, bbox))
+    if not nodes:
+        raise RuntimeError('No coordinates were read.')
+
+    # Visit the nodes in order of curve position
+    visit = np.argsort(np.concatenate(keys), kind='mergesort')
+    cycle = StartCycle([nodes[a] for a in visit], start_node)
+
+    print('Cycle through %d nodes' % len(nodes))
+
+    return(cycle)
+
+# Read "node,x,y" lines from a text file, yielding lists of chunk_size
+# (node, x, y) tuples; node names are kept as strings
+def ReadCoordChunks(filename, chunk_size=100000):
+    chunk = []
+    with open(filename) as coord_file:
+        for line in coord_file:
+            fields = line.strip().split(',')
+            if len(fields) < 3:
+                continue
+            try:
+                chunk.append((fields[0], float(fields[1]), float(fields[2])))
+            except ValueError:
+                # Skip a header line
+                continue
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+# Compute the Hilbert curve position of each row of the n x 2 array XY,
+# after scaling the bounding box (xmin, ymin, xmax, ymax) onto the grid
+def HilbertKeys(XY, bbox):
+    side = 2**order
+    (xmin, ymin, xmax, ymax) = bbox
+    # Scale both axes alike, so the curve does not stretch the plane
+    span = max(xmax - xmin, ymax - ymin)
+    if span <= 0:
+        span = 1.0
+    x = np.clip(((XY[:, 0] - xmin)/span*(side - 1)).astype(np.int64), 0, side - 1)
+    y = np.clip(((XY[:, 1] - ymin)/span*(side - 1)).astype(np.int64), 0, side - 1)
+    keys = np.zeros(len(XY), dtype=np.int64)
+    # From the coarsest quadrant to the finest, add the quadrant's position
+    # along the curve, then rotate the coordinates into that quadrant's frame
+    s = side // 2
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        keys += s*s*((3*rx) ^ ry)
+        flip = ~ry & rx
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        swap = ~ry
+        (x, y) = (np.where(swap, y, x), np.where(swap, x, y))
+        s = s // 2
+    return(keys)
+
+# Close the visiting order into a cycle, starting at start_node if given
+def StartCycle(order_nodes, start_node):
+    if start_node != None:
+        try:
+            p = order_nodes.index(start_node)
+        except ValueError:
+            raise RuntimeError('Start node %s not in graph.' % str(start_node))
+        order_nodes = order_nodes[p:] + order_nodes[:p]
+    return(order_nodes + [order_nodes[0]])
@@ -0,0 +1,150 @@
+# Python Code for Spatial Indexing of Node Coordinates
+#
+#
+#  KDTreeIndex
+#
+#  a class which stores 2-D points in a k-d tree, with a bounding box and a
+#  count of remaining points for each subtree, and answers nearest remaining
+#  point queries.  Points can be removed once used; emptied subtrees are
+#  skipped, so queries stay fast as the tree empties, even when the points
+#  are strongly clustered
+#
+#  GetCoords
+#
+#  a function which returns the node list and an n x 2 array of coordinates
+#  for a networkx graph with a 'pos' node attribute, a CostMatrix that knows
+#  its coordinates, or a dictionary {node:(x,y)}
+#
+
+# Module imports
+import numpy as np
+import cost_matrix as cm
+
+# Largest number of points in a leaf of the tree
+leaf_size = 8
+
+class KDTreeIndex(object):
+    """ A class for nearest neighbor queries over points with removal """
+    # How the KDTreeIndex object represents itself to others
+    def __repr__(self):
+        return('KDTreeIndex(%d points, %d tree nodes)' % (self.count[0], len(self.count)))
+
+    # Construct with an n x 2 array of coordinates; points are referred to
+    # by their row index
+    def __init__(self, coords):
+        XY = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.xs = XY[:, 0].tolist()
+        self.ys = XY[:, 1].tolist()
+        # Tree nodes are stored in parallel lists: the children (-1 for a
+        # leaf), the parent, the bounding box, the remaining point count, and
+        # for leaves the list of remaining points
+        self.left = []
+        self.right = []
+        self.parent = []
+        self.box = []
+        self.count = []
+        self.points = []
+        # The leaf holding each point
+        self.leaf_of = [0]*len(self.xs)
+        # Split ranges of the permutation perm, widest side at the median
+        perm = np.arange(len(self.xs))
+        stack = [(0, len(self.xs), -1, None)]
+        while stack:
+            (lo, hi, parent, side) = stack.pop()
+            t = len(self.count)
+            sub = XY[perm[lo:hi]]
+            if hi > lo:
+                (x0, y0) = sub.min(axis=0).tolist()
+                (x1, y1) = sub.max(axis=0).tolist()
+            else:
+                (x0, y0, x1, y1) = (0.0, 0.0, 0.0, 0.0)
+            self.left.append(-1)
+            self.right.append(-1)
+            self.parent.append(parent)
+            self.box.append((x0, y0, x1, y1))
+            self.count.append(hi - lo)
+            self.points.append(None)
+            if side == 'left':
+                self.left[parent] = t
+            elif side == 'right':
+                self.right[parent] = t
+            if hi - lo <= leaf_size:
+                self.points[t] = perm[lo:hi].tolist()
+                for a in self.points[t]:
+                    self.leaf_of[a] = t
+            else:
+                dim = 0 if x1 - x0 >= y1 - y0 else 1
+                mid = (hi - lo) // 2
+                order = np.argpartition(sub[:, dim], mid)
+                perm[lo:hi] = perm[lo:hi][order]
+                stack.append((lo + mid, hi, t, 'right'))
+                stack.append((lo, lo + mid, t, 'left'))
+
+    # Implements the len() function to give the count of remaining points
+    def __len__(self):
+        return(self.count[0])
+
+    # Remove point a from further queries
+    def remove(self, a):
+        t = self.leaf_of[a]
+        if a not in self.points[t]:
+            return
+        self.points[t].remove(a)
+        while t != -1:
+            self.count[t] -= 1
+            t = self.parent[t]
+
+    # Return the remaining point nearest to (x,y), or None if none remain
+    def nearest(self, x, y):
+        best = None
+        best_dist = float('inf')
+        # Stack of (squared distance to bounding box, tree node)
+        stack = [(0.0, 0)]
+        while stack:
+            (box_dist, t) = stack.pop()
+            # Skip subtrees whose bounding box is no closer than the best
+            if box_dist >= best_dist:
+                continue
+            if self.left[t] == -1:
+                for a in self.points[t]:
+                    dx = self.xs[a] - x
+                    dy = self.ys[a] - y
+                    dist = dx*dx + dy*dy
+                    if dist < best_dist:
+                        best = a
+                        best_dist = dist
+                continue
+            # Search the child nearer to (x,y) first, skipping empty ones
+            children = []
+            for c in (self.left[t], self.right[t]):
+                if not self.count[c]:
+                    continue
+                (x0, y0, x1, y1) = self.box[c]
+                dx = x0 - x if x < x0 else (x - x1 if x > x1 else 0.0)
+                dy = y0 - y if y < y0 else (y - y1 if y > y1 else 0.0)
+                children.append((dx*dx + dy*dy, c))
+            if len(children) == 2 and children[0][0] < children[1][0]:
+                children.reverse()
+            stack.extend(children)
+        return(best)
+
+
+# Return the node list and an n x 2 coordinate array for a networkx graph
+# with 'pos' node attributes, a CostMatrix with coords, or {node:(x,y)}
+def GetCoords(G):
+    if isinstance(G, cm.CostMatrix):
+        if G.coords is None:
+            raise RuntimeError('Cost matrix was not built from coordinates.')
+        return(G.nodes, np.asarray(G.coords, dtype=np.float64))
+    if isinstance(G, dict):
+        nodes = list(G.keys())
+        return(nodes, np.array([G[node] for node in nodes], dtype=np.float64))
+    nodes = []
+    coords = []
+    for (node, attr) in G.nodes(data=True):
+        try:
+            coords.append(attr['pos'])
+        except KeyError:
+            raise RuntimeError('Each node must have a pos attribute. Check %s' % str(node))
+        nodes.append(node)
+    return(nodes, np.array(coords, dtype=np.float64).reshape(len(nodes), 2))
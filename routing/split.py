@@ -0,0 +1,103 @@
+# Python Code for the Split Procedure
+#
+#
+#  SplitRoutes
+#
+#  a function which, given a complete graph in the networkx format with a
+#  'demand' attribute on each node, the vehicle capacity Q and a cycle
+#  (a giant tour, such as from two_opt.TwoOptCycle), returns the routes
+#  that cut the cycle into capacity-feasible pieces at least total cost,
+#  each piece served from the depot and back, as in Prins' Split.  The
+#  depot is dropped from the cycle, if it is there, and the customers are
+#  split in cycle order from the depot's successor
+#
+#  SplitTour
+#
+#  the Split itself, over node indices, without printing: a decoder for
+#  population-based searches, which evolve giant tours.  The best split
+#  is a shortest path over tour positions 0, ..., n, where arc (i,j)
+#  serves the customers at positions i+1 through j on one route.  With
+#  prefix sums of demand and of tour arc costs, each arc costs O(1), and
+#  all arcs out of position i are relaxed together; only positions j
+#  whose route load fits Q are tried, so Split takes O(n B) time for
+#  routes of at most B customers.  Returns (total cost, routes of indices)
+#
+#  Demands are read from the 'demand' node attributes of G, unless given
+#  as a dictionary {node:demand}; the node with no demand is the depot.
+#  G may also be a CostMatrix (see cost_matrix.py); a networkx graph is
+#  converted to one once up front
+#
+#  routes will be in node list format: [[depot, ..., depot], ...]
+#
+
+# Module imports
+import numpy as np
+import cost_matrix as cm
+import vrp_tools as vt
+
+def SplitRoutes(G, Q, cycle, demand=None):
+
+    # Convert the graph to a cost matrix once, and work with node indices
+    C = cm.AsCostMatrix(G)
+    (depot, d) = vt.GetDemands(G, C.nodes, demand)
+    if d.max() > Q:
+        a = int(np.argmax(d))
+        raise RuntimeError('Node %s demand %s is over capacity %s' % (str(C.nodes[a]),str(d[a]),str(Q)))
+
+    # The customers in cycle order, from the depot's successor
+    tour = C.to_indices(cycle)
+    if len(tour) > 1 and tour[0] == tour[-1]:
+        tour = tour[:-1]
+    if depot in tour:
+        p = tour.index(depot)
+        tour = tour[p+1:] + tour[:p]
+    if len(tour) != len(C) - 1 or len(set(tour)) != len(tour):
+        raise RuntimeError('Cycle must visit every customer once.')
+
+    (routes_cost, idx_routes) = SplitTour(C, tour, depot, d, Q)
+    routes = [C.to_nodes(route) for route in idx_routes]
+
+    print('%d routes, with cost:%s' % (len(routes),str(routes_cost)))
+
+    return(routes)
+
+def SplitTour(C, tour, depot, d, Q):
+
+    T = np.asarray(tour, dtype=np.int64)
+    n = len(T)
+    if n == 0:
+        return(0.0, [])
+
+    # Prefix sums over tour positions 1, ..., n: load[j] is the demand of
+    # the first j customers, and dist[j] the cost of the tour arcs from
+    # the first customer to the j-th
+    load = np.concatenate([[0], np.cumsum(d[T])])
+    dist = np.concatenate([[0, 0], np.cumsum(C.costs(T[:-1], T[1:]))])
+    # Arc costs from the depot to each customer, and back
+    out = np.asarray(C.costs(depot, T), dtype=np.float64)
+    back = np.asarray(C.costs(T, depot), dtype=np.float64)
+    # Last position each route from position i may reach within capacity
+    reach = np.searchsorted(load, load + Q, side='right') - 1
+
+    # Shortest path labels, and the best predecessor position
+    V = np.full(n+1, np.inf)
+    V[0] = 0
+    pred = np.zeros(n+1, dtype=np.int64)
+    for i in range(n):
+        J = reach[i]
+        # Routes serving positions i+1 through j, for j = i+1, ..., J
+        cand = V[i] + out[i] - dist[i+1] + dist[i+1:J+1] + back[i:J]
+        better = cand < V[i+1:J+1]
+        np.copyto(V[i+1:J+1], cand, where=better)
+        np.copyto(pred[i+1:J+1], i, where=better)
+
+    # Walk back from the last position to recover the routes
+    idx_routes = []
+    j = n
+    while j > 0:
+        i = int(pred[j])
+        idx_routes.append([depot] + T[i:j].tolist() + [depot])
+        j = i
+    idx_routes.reverse()
+
+    return(float(V[n]), idx_routes)
@@ -12,6 +12,7 @@ import nearest_insertion_simple as nis
 import farthest_insertion_simple as fis
 import cheapest_insertion_simple as cis
 import two_opt as to
+import multi_start as ms
 
 # Create undirected network
 G1 = nx.Graph()
@@ -71,9 +72,11 @@ print 'What if we start nearest insertion with the longest arc cycle?'
 ni_long_init_cycle = nis.NearInsertionCycle(G1, [4, 7, 4])
 
 print 'Two-Opt Results'
-for j in G1.nodes():
-    print 'Start node %s' % str(j)
-    to_cycle = to.TwoOptCycle(G1, nns.NearNeighCycle(G1, j))
+# All start nodes at once, in parallel
+ms_result = ms.MultiStartCycle(G1, construction_names=['nearest_neighbor'], improvement_names=['two_opt'])
+for run in ms_result['runs']:
+    print 'Start node %s, with cost:%s' % (str(run['start']),str(run['cost']))
+to_cycle = ms_result['cycle']
     
 print 'Two-Opt on a Default Tour'
 to_cycle = to.TwoOptCycle(G1,[5,4,3,2,7,8,1,6,5])
@@ -15,9 +15,112 @@
 #  The basic step in a 2-exchange, where a path [a, ..., b] within
 #  a cycle is reversed from end to start
 #
+#  ArrayTour
+#
+#  a cycle stored as an integer array of node indices, plus the inverse
+#  array of positions, so that next/prev/between queries are O(1) and a
+#  2-exchange reverses whichever side of the cycle is shorter in place.
+#  Move operators (2-opt and later) work on an ArrayTour rather than
+#  rebuilding the cycle list with Flip
+#
+#  CycleCost and FindInsertionLocation also accept a CostMatrix (see
+#  cost_matrix.py) in place of the networkx graph G.  The batched
+#  FindInsertionLocations and FindRouteInsertionLocations are imported
+#  from find_insertion
 #
 
+from array import array
 import networkx as nx
+import cost_matrix as cm
+from find_insertion import FindInsertionLocations, FindRouteInsertionLocations
+
+class ArrayTour(object):
+    """ A class for storing a cycle of node indices with a position index """
+    # How the ArrayTour object represents itself to others
+    def __repr__(self):
+        return('ArrayTour(%s)' % (str(self.cycle())))
+
+    # Construct from a cycle of node indices [first, ..., last, first]; size
+    # is one more than the largest index, if the cycle skips some indices
+    def __init__(self, cycle, size=None):
+        if size == None:
+            size = max(cycle) + 1
+        self.tour = array('i', cycle[:-1])
+        self.pos = array('i', [-1])*size
+        for (p, a) in enumerate(self.tour):
+            if self.pos[a] != -1:
+                raise RuntimeError('Node index %s repeats in cycle: %s' % (str(a),str(cycle)))
+            self.pos[a] = p
+
+    # Implements the len() function to give the node count in the cycle
+    def __len__(self):
+        return(len(self.tour))
+
+    # Implements the test: if a in ArrayTour
+    def __contains__(self, a):
+        return(0 <= a < len(self.pos) and self.pos[a] != -1)
+
+    # Return the successor of a
+    def next(self, a):
+        p = self.pos[a] + 1
+        if p == len(self.tour):
+            p = 0
+        return(self.tour[p])
+
+    # Return the predecessor of a
+    def prev(self, a):
+        return(self.tour[self.pos[a] - 1])
+
+    # Test whether b is on the path from a forward to c (inclusive)
+    def between(self, a, b, c):
+        pa = self.pos[a]
+        pb = self.pos[b]
+        pc = self.pos[c]
+        if pa <= pc:
+            return(pa <= pb <= pc)
+        return(pb >= pa or pb <= pc)
+
+    # Reverse the path from a forward to b in place.  Reversing the rest of
+    # the cycle, from next(b) to prev(a), gives the same cycle, so the
+    # shorter of the two paths is the one reversed
+    def reverse(self, a, b):
+        tour = self.tour
+        pos = self.pos
+        n = len(tour)
+        i = pos[a]
+        j = pos[b]
+        inside = (j - i) % n + 1
+        if 2*inside > n:
+            (i, j) = ((j + 1) % n, (i - 1) % n)
+            inside = n - inside
+        for swap in range(inside // 2):
+            a = tour[i]
+            b = tour[j]
+            tour[i] = b
+            pos[b] = i
+            tour[j] = a
+            pos[a] = j
+            i += 1
+            if i == n:
+                i = 0
+            j -= 1
+            if j < 0:
+                j = n - 1
+
+    # Replace cycle arcs (a,b) and (c,d) with (a,c) and (b,d), where b and d
+    # are on the same side of a and c: either both successors or both
+    # predecessors.  This is a 2-exchange, made by one reverse
+    def flip(self, a, b, c, d):
+        if self.next(a) == b:
+            self.reverse(b, c)
+        else:
+            self.reverse(c, b)
+
+    # Return the cycle as a list of indices [first, ..., last, first],
+    # starting from first if given
+    def cycle(self, first=None):
+        p = 0 if first == None else self.pos[first]
+        return(list(self.tour[p:]) + list(self.tour[:p]) + [self.tour[p]])
 
 # Reverse the path from a to b within the cycle
 # Cycle must have b following a to be flipped: [..., a, ..., b, ...]
@@ -54,6 +157,9 @@ def ReorderCycle(cycle, s):
         
 # Compute the cost of a cycle
 def CycleCost(G, cycle):
+    # With a CostMatrix, sum all cycle arcs at once
+    if isinstance(G, cm.CostMatrix):
+        return(G.cycle_cost(G.to_indices(cycle)))
     cycle_cost = 0
     i = cycle[0]
     for j in cycle[1:]:
@@ -63,6 +169,13 @@ def CycleCost(G, cycle):
  
 # Find minimum cost insertion location for insert_node to cycle 
 def FindInsertionLocation(G, cycle, insert_node):
+    # With a CostMatrix, search all cycle arcs at once
+    if isinstance(G, cm.CostMatrix):
+        best_insertion = G.insertion_location(G.to_indices(cycle), G.index[insert_node])
+        best_insertion['pred'] = G.nodes[best_insertion['pred']]
+        best_insertion['succ'] = G.nodes[best_insertion['succ']]
+        return(best_insertion)
+
     # Initialize
     best_insertion = {}
     
@@ -7,7 +7,8 @@ import random
 import math
 
 import networkx as nx
-import TSP_networkdesign as tspnd
+import farthest_insertion_simple as fi
+import held_karp as hk
 
 # Create undirected network
 G1 = nx.Graph()
@@ -32,6 +33,11 @@ G1.add_edges_from([(4,6,{'cost':11})])
 
 G1.add_edges_from([(5,6,{'cost':18})])
 
-print 'Optimal Tour'
-opttsp_cycle = tspnd.TSP_networkdesign(G1)
+print 'Heuristic Tour'
+fi_cycle = fi.FarInsertionCycle(G1)
+
+# Bound the optimal tour cost with the Held-Karp 1-tree bound, instead of
+# solving the TSP_networkdesign model, and report the tour's gap
+print 'Held-Karp Lower Bound'
+gap = hk.OptimalityGap(G1, fi_cycle)
 
@@ -7,11 +7,27 @@
 #  networkx format, and an initial cycle, returns a cycle improved by a series
 #  of two-exchanges.  We implement an exhaustive first-improving search
 #
+#  TwoOptNeighborCycle
+#
+#  a faster version of TwoOptCycle for large cycles, which only considers
+#  new arcs from each node to its k nearest neighbors, and uses "don't-look
+#  bits": a node is only searched again after one of its cycle arcs changes.
+#  Improving exchanges are made as soon as found, without restarting the
+#  scan.  Costs are assumed symmetric, as in Find2Exchange
+#
+#  Both functions store the cycle as a tsp_tools.ArrayTour, so that each
+#  2-exchange reverses the shorter side of the cycle in place
+#
 #  cycles will be in node list format: [first, ..., last, first]
 #
+#  G may also be a CostMatrix (see cost_matrix.py); a networkx graph is
+#  converted to one once up front
+#
 
 # Module imports
 import networkx as nx
+import numpy as np
+import cost_matrix as cm
 import tsp_tools as tt
 
 # Zero tolerance
@@ -19,40 +35,95 @@ zero = 0.000001
 
 def TwoOptCycle(G, init_cycle=None):
     
+    # Convert the graph to a cost matrix once
+    G = cm.AsCostMatrix(G)
+    
     # If initial cycle is empty, use default node tour
     if init_cycle == None:
-        cycle = G.nodes() + [G.nodes()[0]]
+        cycle = G.nodes + [G.nodes[0]]
     else:
         cycle = init_cycle[:]
         
     # Compute initial cost
     cycle_cost = tt.CycleCost(G, cycle)
     
+    # Store the cycle as an ArrayTour, so that each flip is made in place
+    first = G.index[cycle[0]]
+    tour = tt.ArrayTour(G.to_indices(cycle), len(G))
+    
     # Find improving 2-exchanges
     while True:
-        # Look for first improving 2-exchange
-        exchange = Find2Exchange(G, cycle)
+        # Look for first improving 2-exchange, scanning the tour in place
+        exchange = Find2Exchange(G, tour, first)
         
         # If none found, stop the search
         if exchange['savings'] <= 0:
             break
         else:
             # Implement the implied flip, and record the cost savings
-            cycle = tt.Flip(cycle, exchange['leaving_arcs'][0][1], exchange['leaving_arcs'][1][0])
+            tour.reverse(exchange['leaving_arcs'][0][1], exchange['leaving_arcs'][1][0])
             cycle_cost = cycle_cost - exchange['savings']
             # print('Found a new tour with savings of: %s' % str(exchange['savings']))
-            print('New tour: %s' % str(cycle))
+            
+    # Rebuild the node list once, from the original first node
+    cycle = G.to_nodes(tour.cycle(first))
             
     print('Cycle: %s, with cost:%s' % (str(cycle),str(cycle_cost)))
        
     return(cycle)
     
-# Find first improving 2-exchange in a cycle
-def Find2Exchange(G, cycle):
+# Find first improving 2-exchange in a cycle.  The cycle may also be an
+# ArrayTour of node indices with a CostMatrix G, scanned in place from
+# index first; the arcs of the exchange are then in index terms
+def Find2Exchange(G, cycle, first=None):
     
     # Initial exchange finds no savings
     exchange = {'savings':0}
     
+    # With a CostMatrix, scan an ArrayTour of the cycle
+    if isinstance(G, cm.CostMatrix) and not isinstance(cycle, tt.ArrayTour):
+        idx_cycle = G.to_indices(cycle)
+        exchange = Find2Exchange(G, tt.ArrayTour(idx_cycle, len(G)), idx_cycle[0])
+        if exchange['savings'] > 0:
+            exchange['leaving_arcs'] = [tuple(G.to_nodes(arc)) for arc in exchange['leaving_arcs']]
+            exchange['entering_arcs'] = [tuple(G.to_nodes(arc)) for arc in exchange['entering_arcs']]
+        return(exchange)
+    
+    # With an ArrayTour, evaluate all b for each a at once.  The tour array
+    # is read in place, at positions counted forward from first
+    if isinstance(cycle, tt.ArrayTour):
+        tour = cycle
+        n = len(tour)
+        T = np.frombuffer(tour.tour, dtype=np.intc)
+        p0 = tour.pos[first]
+        pred_a = first
+        a = tour.next(first)
+        for a_idx in range(1, n-2):
+            # Nodes b, and then succ_b, from a_idx+1 on around to first: a
+            # view of the tour array, unless it wraps past the end
+            start = (p0 + a_idx + 1) % n
+            end = start + n - a_idx
+            if end <= n:
+                chain = T[start:end]
+            else:
+                chain = np.concatenate((T[start:], T[:end-n]))
+            # Native integer indices for the cost lookups
+            chain = chain.astype(np.intp)
+            b = chain[:-1]
+            succ_b = chain[1:]
+            savings = G.cost(pred_a, a) + G.costs(b, succ_b) - G.costs(pred_a, b) - G.costs(a, succ_b)
+            improving = np.flatnonzero(savings > zero)
+            # If improving, return the first improving exchange
+            if len(improving):
+                (b, succ_b) = (int(b[improving[0]]), int(succ_b[improving[0]]))
+                exchange['savings'] = float(savings[improving[0]])
+                exchange['leaving_arcs'] = [(pred_a,a), (b, succ_b)]
+                exchange['entering_arcs'] = [(pred_a,b), (a, succ_b)]
+                return(exchange)
+            pred_a = a
+            a = tour.next(a)
+        return(exchange)
+    
     # Node a is the head node of (pred_a, a) = x_1 to be removed
     for a_idx in range(1, len(cycle)-3):
         pred_a = cycle[a_idx-1]
@@ -71,3 +142,91 @@ def Find2Exchange(G, cycle):
                 return(exchange)
             
     return(exchange)
+
+def TwoOptNeighborCycle(G, init_cycle=None, k=10):
+    
+    # Convert the graph to a cost matrix once, and work with node indices
+    C = cm.AsCostMatrix(G)
+    
+    # If initial cycle is empty, use default node tour
+    if init_cycle == None:
+        init_cycle = C.nodes + [C.nodes[0]]
+    
+    # Store the cycle as an ArrayTour, so that each flip is made in place
+    tour = tt.ArrayTour(C.to_indices(init_cycle), len(C))
+    n = len(tour)
+    if n < len(C):
+        raise RuntimeError('Neighbor list 2-opt requires a cycle visiting every node.')
+    if n < 5:
+        return(TwoOptCycle(C, init_cycle))
+        
+    # Neighbor lists, and their costs, for the candidate new arcs
+    neighbors = C.neighbors(k)
+    neighbor_costs = C.costs(np.arange(len(C))[:, np.newaxis], neighbors).tolist()
+    neighbors = neighbors.tolist()
+    
+    # Compute initial cost
+    cycle_cost = tt.CycleCost(C, init_cycle)
+    
+    # All nodes start with their don't-look bits off, waiting in the queue
+    queue = list(reversed(tour.tour))
+    queued = [False]*len(C)
+    for a in queue:
+        queued[a] = True
+    
+    # Search nodes until every don't-look bit is on
+    while queue:
+        a = queue.pop()
+        queued[a] = False
+        while True:
+            exchange = TwoOptNodeMove(C, tour, a, neighbors, neighbor_costs)
+            if exchange['savings'] <= 0:
+                break
+            cycle_cost = cycle_cost - exchange['savings']
+            # Turn off the don't-look bits of the end nodes
+            for e in exchange['nodes']:
+                if not queued[e]:
+                    queued[e] = True
+                    queue.append(e)
+    
+    # Return the cycle starting from the original first node
+    cycle = C.to_nodes(tour.cycle(C.index[init_cycle[0]]))
+    
+    print('Cycle: %s, with cost:%s' % (str(cycle),str(cycle_cost)))
+    
+    return(cycle)
+
+# Find and make the first improving 2-exchange that removes a cycle arc at
+# node index a, adding an arc from a to one of its neighbors.  Returns the
+# savings, and the end nodes of the changed arcs other than a
+def TwoOptNodeMove(C, tour, a, neighbors, neighbor_costs):
+    
+    # Initial exchange finds no savings
+    exchange = {'savings':0}
+    
+    # Try removing the arc to the successor, then to the predecessor
+    for forward in (True, False):
+        if forward:
+            b = tour.next(a)
+        else:
+            b = tour.prev(a)
+        ab_cost = C.cost(a, b)
+        for (c, ac_cost) in zip(neighbors[a], neighbor_costs[a]):
+            # New arc (a,c) must be cheaper than removed arc (a,b)
+            if ac_cost >= ab_cost:
+                break
+            if forward:
+                d = tour.next(c)
+            else:
+                d = tour.prev(c)
+            if c == b or d == a:
+                continue
+            # Remove (a,b) and (c,d), add (a,c) and (b,d)
+            savings = ab_cost + C.cost(c, d) - ac_cost - C.cost(b, d)
+            if savings > zero:
+                tour.flip(a, b, c, d)
+                exchange['savings'] = savings
+                exchange['nodes'] = [b, c, d]
+                return(exchange)
+    
+    return(exchange)
@@ -0,0 +1,334 @@
+# Python Code for Vehicle Routing Local Search
+#
+#
+#  LocalSearchRoutes
+#
+#  a function which, given a complete graph (undirected, or with symmetric
+#  costs) in the networkx format with a 'demand' attribute on each node,
+#  the vehicle capacity Q and initial routes (from any construction
+#  heuristic), returns routes improved by a descent over these moves:
+#
+#   RelocateNodeMove     - a segment of 1 to 3 customers moves next to
+#                          another customer, on another route or its own
+#                          (Or-opt), in either orientation
+#   SwapNodeMove         - two customers on different routes trade places
+#   TwoOptStarNodeMove   - two routes trade their tails (2-opt*)
+#   TwoOptRouteNodeMove  - a path within one route is reversed (2-opt)
+#
+#  As in or_opt.LocalSearchCycle, each move at customer a only adds an arc
+#  from a to one of its k nearest neighbors, the first improving move
+#  found is made, and "don't-look bits" skip customers whose route arcs
+#  have not changed.  Routes are kept in a vrp_tools.RouteSet, whose
+#  prefix loads give the load of any route segment, so both the capacity
+#  check and the cost change of a move take O(1) time.  The search stops
+#  early once time_limit seconds pass
+#
+#  Inputs:
+#
+#   G           - network in networkx format, or a CostMatrix
+#   Q           - vehicle capacity
+#   init_routes - routes, each [depot, ..., depot], visiting every
+#                 customer once
+#   demand      - optional dictionary {node:demand}; by default the
+#                 'demand' node attributes of G.  The node with no demand
+#                 is the depot
+#   k           - neighbor list length
+#   node_moves  - optional list of move functions; default all four
+#
+#  Routes emptied by the moves are dropped
+#
+#  routes will be in node list format: [[depot, ..., depot], ...]
+#
+
+# Module imports
+import time
+import numpy as np
+import cost_matrix as cm
+import vrp_tools as vt
+
+# Zero tolerance
+zero = 0.000001
+
+# Longest segment relocated
+max_segment = 3
+
+def LocalSearchRoutes(G, Q, init_routes, demand=None, k=10, node_moves=None, time_limit=None):
+
+    # Start the clock
+    start_time = time.time()
+
+    # Convert the graph to a cost matrix once, and work with node indices
+    C = cm.AsCostMatrix(G)
+    (depot, d) = vt.GetDemands(G, C.nodes, demand)
+    if node_moves == None:
+        node_moves = [RelocateNodeMove, SwapNodeMove, TwoOptStarNodeMove, TwoOptRouteNodeMove]
+
+    # Store the routes as a RouteSet, so that each move is made in place
+    if len(init_routes) == 0 and len(C) > 1:
+        raise RuntimeError('Routes must visit every customer once.')
+    routes = vt.RouteSet([C.to_indices(route) for route in init_routes], depot, d, Q)
+    for r in range(len(routes)):
+        if routes.routes[r][0] != depot or routes.routes[r][-1] != depot:
+            raise RuntimeError('Route %s must run from depot %s and back.' % (str(init_routes[r]),str(C.nodes[depot])))
+        if routes.load(r) > Q:
+            raise RuntimeError('Route %s carries %s, over capacity %s' % (str(init_routes[r]),str(routes.load(r)),str(Q)))
+
+    # Neighbor lists, and their costs, for the candidate new arcs
+    neighbors = C.neighbors(k)
+    neighbor_costs = C.costs(np.arange(len(C))[:, np.newaxis], neighbors).tolist()
+    neighbors = neighbors.tolist()
+
+    # Compute initial cost
+    routes_cost = sum(C.cycle_cost(route) for route in routes.routes)
+
+    # All customers start with their don't-look bits off, waiting in the queue
+    queue = [a for route in reversed(routes.routes) for a in reversed(route[1:-1])]
+    queued = [False]*len(C)
+    for a in queue:
+        queued[a] = True
+
+    # Search customers until every don't-look bit is on
+    while queue:
+        if time_limit != None and time.time() - start_time > time_limit:
+            break
+        a = queue.pop()
+        queued[a] = False
+        improved = True
+        while improved:
+            improved = False
+            for node_move in node_moves:
+                exchange = node_move(C, routes, a, neighbors, neighbor_costs)
+                if exchange['savings'] > 0:
+                    routes_cost = routes_cost - exchange['savings']
+                    # Turn off the don't-look bits of the end customers
+                    for e in exchange['nodes']:
+                        if e != depot and not queued[e]:
+                            queued[e] = True
+                            queue.append(e)
+                    improved = True
+                    break
+
+    routes = [C.to_nodes(route) for route in routes.idx_routes()]
+
+    print('%d routes, with cost:%s' % (len(routes),str(routes_cost)))
+
+    return(routes)
+
+# Find and make the first improving move of a segment with end customer a
+# to sit next to one of a's neighbors.  Returns the savings, and the end
+# nodes of the changed arcs
+def RelocateNodeMove(C, routes, a, neighbors, neighbor_costs):
+
+    # Initial exchange finds no savings
+    exchange = {'savings':0}
+    depot = routes.depot
+    ra = routes.route_of[a]
+    route = routes.routes[ra]
+    p = routes.pos[a]
+
+    # Segments of customers at positions f through l, with a at one end
+    for length in range(1, max_segment+1):
+        # A single customer segment is the same either way
+        if length == 1:
+            segments = [(p, p)]
+        else:
+            segments = [(p, p+length-1), (p-length+1, p)]
+        for (f, l) in segments:
+            if f < 1 or l > len(route) - 2:
+                continue
+            # The other end of the segment from a
+            e = route[l] if route[f] == a else route[f]
+            # Savings from closing the gap left by the segment
+            gap_savings = C.cost(route[f-1], route[f]) + C.cost(route[l], route[l+1]) - C.cost(route[f-1], route[l+1])
+            size = routes.segment_load(ra, f, l)
+            for (b, ab_cost) in zip(neighbors[a], neighbor_costs[a]):
+                # New arc (a,b) must be cheaper than the gap savings
+                if ab_cost >= gap_savings:
+                    break
+                if b == depot:
+                    continue
+                rb = routes.route_of[b]
+                if rb == ra:
+                    if f <= routes.pos[b] <= l:
+                        continue
+                elif routes.load(rb) + size > routes.Q:
+                    continue
+                b_route = routes.routes[rb]
+                q = routes.pos[b]
+                # Either b, a, ..., e, y on arc (b,y) at position q, or
+                # x, e, ..., a, b on arc (x,b) at position q-1
+                for u in (q, q-1):
+                    # The arc must not touch the segment
+                    if rb == ra and f-1 <= u <= l:
+                        continue
+                    (x, y) = (b_route[u], b_route[u+1])
+                    if x == b:
+                        savings = gap_savings + C.cost(x, y) - ab_cost - C.cost(e, y)
+                    else:
+                        savings = gap_savings + C.cost(x, y) - C.cost(x, e) - ab_cost
+                    if savings > zero:
+                        segment = route[f:l+1]
+                        if (x == b) != (segment[0] == a):
+                            segment.reverse()
+                        rest = route[:f] + route[l+1:]
+                        if rb == ra:
+                            # Insert after the position of x, once the
+                            # segment is gone
+                            if u > l:
+                                u = u - length
+                            routes.replace(ra, rest[:u+1] + segment + rest[u+1:])
+                        else:
+                            routes.replace(ra, rest)
+                            routes.replace(rb, b_route[:u+1] + segment + b_route[u+1:])
+                        exchange['savings'] = savings
+                        exchange['nodes'] = [route[f-1], route[f], route[l], route[l+1], x, y]
+                        return(exchange)
+
+    return(exchange)
+
+# Find and make the first improving swap of customer a with a customer on
+# another route next to one of a's neighbors, so a and the neighbor become
+# adjacent.  Returns the savings, and the end nodes of the changed arcs
+def SwapNodeMove(C, routes, a, neighbors, neighbor_costs):
+
+    # Initial exchange finds no savings
+    exchange = {'savings':0}
+    depot = routes.depot
+    d = routes.d
+    ra = routes.route_of[a]
+    ap = routes.prev(a)
+    an = routes.next(a)
+    a_cost = C.cost(ap, a) + C.cost(a, an)
+
+    for b in neighbors[a]:
+        if b == depot or routes.route_of[b] == ra:
+            continue
+        for c in (routes.prev(b), routes.next(b)):
+            if c == depot:
+                continue
+            rc = routes.route_of[c]
+            # The loads of both routes after the swap must fit
+            if routes.load(ra) - d[a] + d[c] > routes.Q or routes.load(rc) - d[c] + d[a] > routes.Q:
+                continue
+            cp = routes.prev(c)
+            cn = routes.next(c)
+            savings = a_cost + C.cost(cp, c) + C.cost(c, cn) - C.cost(ap, c) - C.cost(c, an) - C.cost(cp, a) - C.cost(a, cn)
+            if savings > zero:
+                pa = routes.pos[a]
+                pc = routes.pos[c]
+                a_route = routes.routes[ra][:]
+                c_route = routes.routes[rc][:]
+                a_route[pa] = c
+                c_route[pc] = a
+                routes.replace(ra, a_route)
+                routes.replace(rc, c_route)
+                exchange['savings'] = savings
+                exchange['nodes'] = [ap, a, an, cp, c, cn]
+                return(exchange)
+
+    return(exchange)
+
+# Find and make the first improving 2-opt* move adding an arc from a to one
+# of its neighbors on another route: the routes are cut next to a and b,
+# and trade their tails.  Returns the savings, and the end nodes of the
+# changed arcs
+def TwoOptStarNodeMove(C, routes, a, neighbors, neighbor_costs):
+
+    # Initial exchange finds no savings
+    exchange = {'savings':0}
+    depot = routes.depot
+    Q = routes.Q
+    ra = routes.route_of[a]
+    pa = routes.pos[a]
+    ap = routes.prev(a)
+    an = routes.next(a)
+    load_a = routes.load(ra)
+    longest = max(C.cost(a, an), C.cost(ap, a))
+
+    for (b, ab_cost) in zip(neighbors[a], neighbor_costs[a]):
+        # New arc (a,b) must be cheaper than one of the arcs it replaces
+        if ab_cost >= longest:
+            break
+        if b == depot:
+            continue
+        rb = routes.route_of[b]
+        if rb == ra:
+            continue
+        qb = routes.pos[b]
+        bp = routes.prev(b)
+        bn = routes.next(b)
+        load_b = routes.load(rb)
+        a_route = routes.routes[ra]
+        b_route = routes.routes[rb]
+        # Either [..., a, b, ...] and [..., bp, an, ...], or
+        # [..., b, a, ...] and [..., ap, bn, ...]
+        for a_first in (True, False):
+            if a_first:
+                head_a = routes.prefix[ra][pa]
+                head_b = routes.prefix[rb][qb-1]
+                savings = C.cost(a, an) + C.cost(bp, b) - ab_cost - C.cost(bp, an)
+            else:
+                head_a = routes.prefix[ra][pa-1]
+                head_b = routes.prefix[rb][qb]
+                savings = C.cost(ap, a) + C.cost(b, bn) - ab_cost - C.cost(ap, bn)
+            if savings <= zero:
+                continue
+            # Route loads after the trade, from the prefix loads
+            if head_a + load_b - head_b > Q or head_b + load_a - head_a > Q:
+                continue
+            if a_first:
+                routes.replace(ra, a_route[:pa+1] + b_route[qb:])
+                routes.replace(rb, b_route[:qb] + a_route[pa+1:])
+                exchange['nodes'] = [a, an, bp, b]
+            else:
+                routes.replace(ra, b_route[:qb+1] + a_route[pa:])
+                routes.replace(rb, a_route[:pa] + b_route[qb+1:])
+                exchange['nodes'] = [ap, a, b, bn]
+            exchange['savings'] = savings
+            return(exchange)
+
+    return(exchange)
+
+# Find and make the first improving 2-exchange within a's route that adds
+# an arc from a to one of its neighbors on the same route.  Returns the
+# savings, and the end nodes of the changed arcs
+def TwoOptRouteNodeMove(C, routes, a, neighbors, neighbor_costs):
+
+    # Initial exchange finds no savings
+    exchange = {'savings':0}
+    ra = routes.route_of[a]
+    route = routes.routes[ra]
+    pa = routes.pos[a]
+    ap = route[pa-1]
+    an = route[pa+1]
+    longest = max(C.cost(a, an), C.cost(ap, a))
+
+    for (b, ab_cost) in zip(neighbors[a], neighbor_costs[a]):
+        # New arc (a,b) must be cheaper than one of the arcs it replaces
+        if ab_cost >= longest:
+            break
+        if b == routes.depot or routes.route_of[b] != ra:
+            continue
+        qb = routes.pos[b]
+        # Replace (a,an) and (b,bn) with (a,b) and (an,bn), or (ap,a) and
+        # (bp,b) with (ap,bp) and (a,b), reversing the path between
+        for after in (True, False):
+            if after:
+                (c, e) = (an, route[qb+1])
+                savings = C.cost(a, c) + C.cost(b, e) - ab_cost - C.cost(c, e)
+            else:
+                (c, e) = (ap, route[qb-1])
+                savings = C.cost(c, a) + C.cost(e, b) - ab_cost - C.cost(c, e)
+            if c == b or e == a or savings <= zero:
+                continue
+            # Reverse the positions strictly between the two new arcs
+            if after:
+                (i, j) = (min(pa, qb) + 1, max(pa, qb))
+            else:
+                (i, j) = (min(pa, qb), max(pa, qb) - 1)
+            routes.replace(ra, route[:i] + route[i:j+1][::-1] + route[j+1:])
+            exchange['savings'] = savings
+            exchange['nodes'] = [a, b, c, e]
+            return(exchange)
+
+    return(exchange)
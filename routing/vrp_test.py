@@ -10,6 +10,11 @@ import networkx as nx
 import VRP_networkdesign as vrpnd
 import TSP_networkdesign as tspnd
 import farthest_insertion_simple as fi
+import clarke_wright as cw
+import cluster_first as cf
+import vrp_local_search as vls
+import two_opt as to
+import split as sp
 
 # Create undirected network
 G1 = nx.Graph()
@@ -47,6 +52,9 @@ Q = 6
 print 'Optimal Tours'
 opt_tours = vrpnd.VRP_networkdesign(G1, Q)
 
+print 'Clarke-Wright Savings Routes'
+cw_routes = cw.SavingsRoutes(G1, Q)
+
 
 # Create harder network
 G2 = nx.Graph()
@@ -172,11 +180,27 @@ for i in range(1,n):
         delta_y = G2.node[i]['pos'][1] - G2.node[j]['pos'][1]
         G2[i][j]['cost'] = math.sqrt(delta_x**2 + delta_y**2)
 
-print 'Finding Optimal TSP Tour...'    
-opttsp_cycle = tspnd.TSP_networkdesign(G2)
-
 print 'Finding Farthest Insertion Tour'
 fi_cycle = fi.FarInsertionCycle(G2)
 
+print 'Splitting the 2-Opt Improved Tour into Routes'
+to_cycle = to.TwoOptCycle(G2, fi_cycle)
+split_routes = sp.SplitRoutes(G2, 15, to_cycle)
+
+print 'Finding Optimal TSP Tour, starting from the Farthest Insertion Tour...'
+opttsp_cycle = tspnd.TSP_networkdesign(G2, fi_cycle)
+
+print 'Finding Clarke-Wright Savings Routes'
+cw_routes = cw.SavingsRoutes(G2, 15)
+
+print 'Finding Sweep Routes'
+sweep_routes = cf.ClusterFirstRoutes(G2, 15, method='sweep')
+
+print 'Finding Capacitated K-Means Routes'
+kmeans_routes = cf.ClusterFirstRoutes(G2, 15, method='kmeans')
+
+print 'Improving the Clarke-Wright Routes by Local Search'
+ls_routes = vls.LocalSearchRoutes(G2, 15, cw_routes)
+
 print 'Finding Optimal VRP Solution'
 vrpnd.VRP_networkdesign(G2, 15)
@@ -0,0 +1,131 @@
+# Python Code Implementing Basic Vehicle Routing Tools
+#
+#
+#  GetDemands
+#
+#  a function which returns the depot index and an array of node demands
+#  by index, for the node names listed in nodes (such as C.nodes for a
+#  CostMatrix C).  Demands are read from the 'demand' node attributes of
+#  the networkx graph G, unless given as a dictionary {node:demand}.  As
+#  in VRP_networkdesign, the node with no demand is assumed to be the
+#  depot (the first one, if several have none)
+#
+#  RoutesCost
+#
+#  a function which, given a graph in the networkx format (or a
+#  CostMatrix) and a list of routes, returns their total cost
+#
+#  CheckRoutes
+#
+#  a function which raises an error unless the routes each run
+#  [depot, ..., depot], stay within vehicle capacity Q, and together
+#  visit every customer exactly once
+#
+#  RouteSet
+#
+#  routes stored as lists of node indices, plus the route and position of
+#  each customer and a prefix array of demand along each route, so that
+#  the load of a route or of any segment of it is found in O(1) time.
+#  Move operators on several routes (see vrp_local_search.py) work on a
+#  RouteSet, and rebuild only the routes they change
+#
+#  routes will be in node list format: [[depot, ..., depot], ...]
+#
+
+from array import array
+import numpy as np
+import cost_matrix as cm
+import tsp_tools as tt
+
+def GetDemands(G, nodes, demand=None):
+    if demand == None:
+        if isinstance(G, cm.CostMatrix):
+            raise RuntimeError('Demands must be given as a dictionary with a cost matrix.')
+        demand = dict((i, attr['demand']) for (i, attr) in G.nodes(data=True))
+    try:
+        d = np.array([demand[node] for node in nodes], dtype=np.float64)
+    except KeyError as err:
+        raise RuntimeError('Node %s has no demand.' % str(err.args[0]))
+    zero_demand = np.flatnonzero(d == 0)
+    if len(zero_demand) == 0:
+        raise RuntimeError('No depot: every node has a demand.')
+    return(int(zero_demand[0]), d)
+
+def RoutesCost(G, routes):
+    return(sum(tt.CycleCost(G, route) for route in routes))
+
+def CheckRoutes(G, routes, Q, demand=None):
+    C = cm.AsCostMatrix(G)
+    (depot, d) = GetDemands(G, C.nodes, demand)
+    visited = []
+    for route in routes:
+        idx_route = C.to_indices(route)
+        if len(idx_route) < 3 or idx_route[0] != depot or idx_route[-1] != depot:
+            raise RuntimeError('Route %s must run from depot %s and back.' % (str(route),str(C.nodes[depot])))
+        load = float(d[idx_route[1:-1]].sum())
+        if load > Q:
+            raise RuntimeError('Route %s carries %s, over capacity %s' % (str(route),str(load),str(Q)))
+        visited.extend(idx_route[1:-1])
+    customers = set(range(len(C))) - set([depot])
+    if len(visited) != len(customers) or set(visited) != customers:
+        raise RuntimeError('Routes must visit every customer once.')
+
+class RouteSet(object):
+    """ A class for storing routes of node indices with position and load indexes """
+    # How the RouteSet object represents itself to others
+    def __repr__(self):
+        return('RouteSet(%s)' % (str(self.routes)))
+
+    # Construct from routes of node indices [depot, ..., depot], the depot
+    # index, the node demands d by index and the vehicle capacity Q
+    def __init__(self, idx_routes, depot, d, Q):
+        self.depot = depot
+        self.d = list(d)
+        self.Q = Q
+        self.route_of = array('i', [-1])*len(self.d)
+        self.pos = array('i', [-1])*len(self.d)
+        self.routes = []
+        self.prefix = []
+        for route in idx_routes:
+            self.routes.append(None)
+            self.prefix.append(None)
+            self.replace(len(self.routes) - 1, list(route))
+
+    # Implements the len() function to give the number of routes
+    def __len__(self):
+        return(len(self.routes))
+
+    # Put route (a list of indices) in place of route r, and rebuild its
+    # positions and prefix loads: prefix[r][p] is the demand of route
+    # positions 0 through p
+    def replace(self, r, route):
+        self.routes[r] = route
+        prefix = [0]*len(route)
+        load = 0
+        for (p, a) in enumerate(route):
+            if 0 < p < len(route) - 1:
+                self.route_of[a] = r
+                self.pos[a] = p
+            load += self.d[a]
+            prefix[p] = load
+        self.prefix[r] = prefix
+
+    # Total demand on route r
+    def load(self, r):
+        return(self.prefix[r][-1])
+
+    # Demand of route r positions p through q
+    def segment_load(self, r, p, q):
+        return(self.prefix[r][q] - self.prefix[r][p-1])
+
+    # Return the successor of customer a on its route
+    def next(self, a):
+        return(self.routes[self.route_of[a]][self.pos[a] + 1])
+
+    # Return the predecessor of customer a on its route
+    def prev(self, a):
+        return(self.routes[self.route_of[a]][self.pos[a] - 1])
+
+    # Return the routes which still visit a customer
+    def idx_routes(self):
+        return([route[:] for route in self.routes if len(route) > 2])